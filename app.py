@@ -1,22 +1,57 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, abort, current_app, has_app_context, request, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy import DDL, column, event, table
+from sqlalchemy.orm import Session, aliased, joinedload
+from flask.cli import with_appcontext
 from flask_migrate import Migrate
+import click
 
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
-import os
+from auth import PasswordHasher, PasswordHasherBusy, TokenSigner
+from caches import LRUCache, PincodeDirectory, ResponseCache
+from config import Config
+from events import EventBroker, format_sse
+from forecasting import demand_matrix, load_numpy, pair_keys, reorder_suggestions
+from metrics import Metrics, query_budget
+from serialization import Field, OrjsonProvider, isoformat, orjson, parse_fields, projected_select, row_serializer
+from traffic import TrafficRecorder
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///inventory.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = 'your-secret-key-here'
+from collections import namedtuple
+import base64
+import csv
+import io
+import json
+import queue
+import re
+import sqlite3
 
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+def skip_search_index(name, type_, parent_names):
+    # product_fts and its shadow tables are managed by hand, keep autogenerate away from them
+    return not (type_ == 'table' and name.startswith('product_fts'))
+
+
+db = SQLAlchemy()
+migrate = Migrate(include_name=skip_search_index)
+api = Blueprint('api', __name__)
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
 
 
 # Models
 class User(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_type_pincode', 'user_type', 'pincode'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(200), nullable=False)
@@ -31,6 +66,11 @@ class User(db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 class StockRequest(db.Model):
+    __table_args__ = (
+        db.Index('ix_stock_request_distributor_created', 'distributor_id', 'created_at'),
+        db.Index('ix_stock_request_requester_created', 'requester_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     
     # Foreign keys
@@ -72,37 +112,113 @@ class Product(db.Model):
     unit_price = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-class DistributorInventory(db.Model):
+# Full-text index over product name/description (SQLite FTS5, external content).
+# Triggers keep it in step with every write, including Core bulk inserts.
+PRODUCT_FTS_DDL = [
+    "CREATE VIRTUAL TABLE product_fts USING fts5("
+    "name, description, content='product', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    # Matches in the name count ten times as much as matches in the description
+    "INSERT INTO product_fts(product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "CREATE TRIGGER product_fts_ai AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER product_fts_ad AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER product_fts_au AFTER UPDATE OF name, description ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+]
+for statement in PRODUCT_FTS_DDL:
+    event.listen(Product.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+# The triggers go with the product table, the virtual table has to be dropped by hand
+event.listen(Product.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS product_fts').execute_if(dialect='sqlite'))
+
+product_fts = table('product_fts', column('rowid'), column('product_fts'), column('rank'))
+
+class Inventory(db.Model):
+    """Current stock per owner and product, kept in step with InventoryMovement."""
+    __table_args__ = (
+        db.Index('ix_inventory_owner_product', 'owner_id', 'product_id', unique=True),
+        db.Index('ix_inventory_owner_updated', 'owner_id', 'updated_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    distributor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # distributor, SHG or pharmacist
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=0)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    distributor = db.relationship('User', backref='distributor_inventory')
-    product = db.relationship('Product', backref='distributor_inventory')
+    owner = db.relationship('User', backref='inventory')
+    product = db.relationship('Product', backref='inventory')
+
+class InventoryMovement(db.Model):
+    """Append-only ledger of every change to an Inventory balance."""
+    __tablename__ = 'inventory_movement'
+    __table_args__ = (
+        db.Index('ix_inventory_movement_owner', 'owner_id', 'id'),
+        db.Index('ix_inventory_movement_owner_product', 'owner_id', 'product_id', 'id'),
+        db.Index('ix_inventory_movement_order', 'order_id'),
+    )
 
-class SHGInventory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    shg_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
-    quantity = db.Column(db.Integer, nullable=False, default=0)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    shg = db.relationship('User', backref='shg_inventory')
-    product = db.relationship('Product', backref='shg_inventory')
+    delta = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(20), nullable=False)  # set, adjustment, delivery_out, delivery_in
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'))
+    note = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class InventoryTombstone(db.Model):
+    __table_args__ = (
+        db.Index('ix_inventory_tombstone_owner_deleted', 'owner_id', 'deleted_at'),
+    )
 
-class PharmacistInventory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    pharmacist_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
-    quantity = db.Column(db.Integer, nullable=False, default=0)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    pharmacist = db.relationship('User', backref='pharmacist_inventory')
-    product = db.relationship('Product', backref='pharmacist_inventory')
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class ReorderThreshold(db.Model):
+    """Low-stock level per owner and product; stock at or below it opens a StockAlert."""
+    __tablename__ = 'reorder_threshold'
+
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    threshold = db.Column(db.Integer, nullable=False)
+
+class StockAlert(db.Model):
+    """Opened when stock falls to its threshold, resolved once it is back above.
+
+    Only unresolved alerts are indexed, so the active set stays small however
+    much history accumulates.
+    """
+    __tablename__ = 'stock_alert'
+    __table_args__ = (
+        db.Index('ix_stock_alert_active_pair', 'owner_id', 'product_id', unique=True,
+                 sqlite_where=db.text('resolved_at IS NULL'), postgresql_where=db.text('resolved_at IS NULL')),
+        db.Index('ix_stock_alert_active_owner', 'owner_id', 'id',
+                 sqlite_where=db.text('resolved_at IS NULL'), postgresql_where=db.text('resolved_at IS NULL')),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    threshold = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    resolved_at = db.Column(db.DateTime)
 
 class Order(db.Model):
+    __table_args__ = (
+        db.Index('ix_order_distributor_created', 'distributor_id', 'created_at'),
+        db.Index('ix_order_orderer_created', 'orderer_id', 'created_at'),
+        db.Index('ix_order_status_created', 'status', 'created_at'),
+        db.Index('ix_order_created', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     distributor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     orderer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -117,14 +233,433 @@ class Order(db.Model):
     distributor = db.relationship('User', foreign_keys=[distributor_id], backref='orders_received')
     orderer = db.relationship('User', foreign_keys=[orderer_id], backref='orders_placed')
     product = db.relationship('Product', backref='orders')
-# Initialize database
-with app.app_context():
-    db.create_all()
+
+class OrderDailyRollup(db.Model):
+    """Per day, distributor and product order totals, kept current as orders are placed and delivered."""
+    __tablename__ = 'order_daily_rollup'
+    __table_args__ = (
+        db.Index('ix_order_daily_rollup_distributor_day', 'distributor_id', 'day'),
+        db.Index('ix_order_daily_rollup_product_day', 'product_id', 'day'),
+    )
+
+    day = db.Column(db.Date, primary_key=True)
+    distributor_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    orders_placed = db.Column(db.Integer, nullable=False, default=0)
+    units_placed = db.Column(db.Integer, nullable=False, default=0)
+    orders_delivered = db.Column(db.Integer, nullable=False, default=0)
+    units_delivered = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    # Sum of (delivered_at - created_at) over delivered orders, for the average
+    delivery_seconds = db.Column(db.Float, nullable=False, default=0)
+
+# User identity cache
+UserIdentity = namedtuple('UserIdentity', ['id', 'username', 'user_type', 'pincode'])
+
+def get_user_identity_or_404(user_id):
+    # Routes only need the role and a few identity fields, which rarely change
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        abort(404)
+    cache = current_app.extensions['user_cache']
+    identity = cache.get(user_id)
+    if identity is None:
+        row = db.session.execute(
+            db.select(User.id, User.username, User.user_type, User.pincode).where(User.id == user_id)
+        ).first()
+        if row is None:
+            abort(404)
+        identity = UserIdentity(*row)
+        cache.set(user_id, identity)
+    return identity
+
+# Cache invalidation
+@event.listens_for(Session, 'after_flush')
+def _track_cached_writes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Product):
+            session.info['products_changed'] = True
+        elif isinstance(obj, User) and obj.id is not None:
+            session.info.setdefault('users_changed', set()).add(obj.id)
+            session.info['directory_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_caches(session):
+    # Invalidate only once the change is visible to other connections
+    products_changed = session.info.pop('products_changed', False)
+    users_changed = session.info.pop('users_changed', ())
+    directory_changed = session.info.pop('directory_changed', False)
+    if not has_app_context():
+        return
+    if products_changed:
+        current_app.extensions['product_cache'].invalidate()
+    if directory_changed:
+        current_app.extensions['distributor_directory'].invalidate()
+    for user_id in users_changed:
+        current_app.extensions['user_cache'].invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_cached_writes(session):
+    session.info.pop('products_changed', None)
+    session.info.pop('users_changed', None)
+    session.info.pop('directory_changed', None)
+    session.info.pop('stock_changed', None)
+
+# Inventory helpers
+INVENTORY_OWNER_TYPES = ['distributor', 'shg', 'pharmacist']
+
+
+@event.listens_for(Inventory, 'after_delete')
+def _record_tombstone(mapper, connection, target):
+    # Lets delta sync clients learn about rows that no longer exist
+    connection.execute(db.insert(InventoryTombstone).values(
+        owner_id=target.owner_id,
+        product_id=target.product_id,
+        deleted_at=datetime.utcnow()
+    ))
+
+def upsert(model):
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def record_movements(movements):
+    # movements are dicts with owner_id, product_id, delta, reason and optionally order_id / note
+    if movements:
+        now = datetime.utcnow()
+        db.session.execute(db.insert(InventoryMovement), [
+            {'order_id': None, 'note': None, 'created_at': now, **movement} for movement in movements
+        ])
+
+
+def set_stock(quantities, reason='set'):
+    """Overwrite balances, logging the difference from the previous quantity.
+
+    ``quantities`` maps (owner_id, product_id) -> new quantity.
+    """
+    if not quantities:
+        return
+    now = datetime.utcnow()
+    params = [{'owner_id': owner_id, 'product_id': product_id, 'quantity': quantity, 'created_at': now}
+              for (owner_id, product_id), quantity in quantities.items()]
+    
+    # Log the delta against the balance as it stands, in the same transaction as the overwrite
+    owner_id = db.bindparam('owner_id', type_=db.Integer)
+    product_id = db.bindparam('product_id', type_=db.Integer)
+    previous = db.select(Inventory.quantity).where(
+        Inventory.owner_id == owner_id, Inventory.product_id == product_id
+    ).scalar_subquery()
+    db.session.execute(
+        db.insert(InventoryMovement.__table__).from_select(
+            ['owner_id', 'product_id', 'delta', 'reason', 'created_at'],
+            db.select(owner_id, product_id, db.bindparam('quantity', type_=db.Integer) - db.func.coalesce(previous, 0),
+                      db.literal(reason), db.bindparam('created_at', type_=db.DateTime))
+        ),
+        params
+    )
+    
+    stmt = upsert(Inventory)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['owner_id', 'product_id'],
+        set_={'quantity': stmt.excluded.quantity, 'updated_at': stmt.excluded.updated_at}
+    )
+    db.session.execute(stmt, [{
+        'owner_id': p['owner_id'],
+        'product_id': p['product_id'],
+        'quantity': p['quantity'],
+        'updated_at': now
+    } for p in params])
+    mark_stock_changed(quantities)
+
+
+def add_stock(movements):
+    """Increment balances (creating rows as needed) and log each movement.
+
+    Each movement needs owner_id, product_id, a positive delta and a reason.
+    """
+    if not movements:
+        return
+    totals = {}
+    for movement in movements:
+        key = (movement['owner_id'], movement['product_id'])
+        totals[key] = totals.get(key, 0) + movement['delta']
+    
+    now = datetime.utcnow()
+    stmt = upsert(Inventory)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['owner_id', 'product_id'],
+        set_={'quantity': Inventory.quantity + stmt.excluded.quantity, 'updated_at': stmt.excluded.updated_at}
+    )
+    db.session.execute(stmt, [{
+        'owner_id': owner_id,
+        'product_id': product_id,
+        'quantity': quantity,
+        'updated_at': now
+    } for (owner_id, product_id), quantity in totals.items()])
+    record_movements(movements)
+    mark_stock_changed(totals)
+
+
+def deduct_stock(owner_id, product_id, quantity):
+    # Check and decrement in one statement so concurrent deliveries cannot both pass the check.
+    # Callers record the matching movements.
+    result = db.session.execute(
+        db.update(Inventory)
+        .where(
+            Inventory.owner_id == owner_id,
+            Inventory.product_id == product_id,
+            Inventory.quantity >= quantity
+        )
+        .values(quantity=Inventory.quantity - quantity, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    mark_stock_changed([(owner_id, product_id)])
+    return True
+
+
+# Low-stock alerts
+def mark_stock_changed(pairs):
+    # (owner_id, product_id) pairs to re-check against their thresholds before commit
+    db.session.info.setdefault('stock_changed', set()).update(pairs)
+
+
+@event.listens_for(Session, 'before_commit')
+def _check_stock_alerts(session):
+    pairs = session.info.pop('stock_changed', None)
+    if pairs:
+        evaluate_stock_alerts(pairs)
+
+
+def pairs_clause(model, pairs):
+    # owner_id = ? AND product_id IN (...) per owner; SQLite can't index a row-value IN list
+    by_owner = {}
+    for owner_id, product_id in pairs:
+        by_owner.setdefault(owner_id, []).append(product_id)
+    return db.or_(*[
+        db.and_(model.owner_id == owner_id, model.product_id.in_(product_ids))
+        for owner_id, product_ids in by_owner.items()
+    ])
+
+
+def evaluate_stock_alerts(pairs, batch_size=500):
+    """Open or resolve alerts for pairs whose stock or threshold changed.
+
+    Only the given pairs are looked at, with one query per batch. An alert
+    opens when stock is at or below the threshold and none is active, and
+    resolves when stock is back above it; staying low (or high) writes nothing.
+    """
+    pairs = list(pairs)
+    now = datetime.utcnow()
+    opened = []
+    resolved = []
+    for i in range(0, len(pairs), batch_size):
+        rows = db.session.execute(
+            db.select(ReorderThreshold.owner_id, ReorderThreshold.product_id, ReorderThreshold.threshold,
+                      Inventory.quantity, StockAlert.id)
+            .outerjoin(Inventory, db.and_(Inventory.owner_id == ReorderThreshold.owner_id,
+                                          Inventory.product_id == ReorderThreshold.product_id))
+            .outerjoin(StockAlert, db.and_(StockAlert.owner_id == ReorderThreshold.owner_id,
+                                           StockAlert.product_id == ReorderThreshold.product_id,
+                                           StockAlert.resolved_at.is_(None)))
+            .where(pairs_clause(ReorderThreshold, pairs[i:i + batch_size]))
+        ).all()
+        for owner_id, product_id, threshold, quantity, alert_id in rows:
+            quantity = quantity or 0
+            if quantity <= threshold and alert_id is None:
+                opened.append({'owner_id': owner_id, 'product_id': product_id, 'threshold': threshold,
+                               'quantity': quantity, 'created_at': now})
+            elif quantity > threshold and alert_id is not None:
+                resolved.append(alert_id)
+    
+    if opened:
+        # A concurrent commit may already have opened the same alert
+        db.session.execute(upsert(StockAlert).on_conflict_do_nothing(), opened)
+    if resolved:
+        resolve_stock_alerts(StockAlert.id.in_(resolved), now)
+
+
+def resolve_stock_alerts(condition, now=None):
+    db.session.execute(
+        db.update(StockAlert).where(condition, StockAlert.resolved_at.is_(None))
+        .values(resolved_at=now or datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def fetch_in_batches(columns, key_column, keys, batch_size=500, criteria=()):
+    # Resolve many ids with a handful of IN (...) queries instead of one query per id
+    keys = list(keys)
+    rows = []
+    for i in range(0, len(keys), batch_size):
+        rows.extend(db.session.execute(
+            db.select(*columns).where(key_column.in_(keys[i:i + batch_size]), *criteria)
+        ).all())
+    return rows
+
+
+ORDER_TRANSITIONS = {
+    'placed': 'accepted',
+    'accepted': 'dispatched',
+    'dispatched': 'delivered'
+}
+
+
+def claim_order_status(order, from_statuses, new_status, timestamp_field):
+    # Conditional UPDATE so two concurrent requests cannot both move the same order
+    result = db.session.execute(
+        db.update(Order)
+        .where(Order.id == order.id, Order.status.in_(from_statuses))
+        .values(status=new_status, **{timestamp_field: datetime.utcnow()})
+        .execution_options(synchronize_session='fetch')
+    )
+    return result.rowcount == 1
+
+
+ROLLUP_COUNTERS = ['orders_placed', 'units_placed', 'orders_delivered', 'units_delivered', 'revenue', 'delivery_seconds']
+
+
+def rollup_increments(placed=(), delivered=(), unit_prices=None, delivered_at=None):
+    """Aggregate orders into {(day, distributor_id, product_id): counters}.
+
+    ``placed`` counts towards each order's created_at day and ``delivered``
+    towards its delivered_at day (or ``delivered_at`` when given), with
+    revenue taken from ``unit_prices``.
+    """
+    increments = {}
+    
+    def counters(day, order):
+        return increments.setdefault((day, order.distributor_id, order.product_id), dict.fromkeys(ROLLUP_COUNTERS, 0))
+    
+    for order in placed:
+        totals = counters(order.created_at.date(), order)
+        totals['orders_placed'] += 1
+        totals['units_placed'] += order.quantity
+    for order in delivered:
+        when = delivered_at or order.delivered_at
+        totals = counters(when.date(), order)
+        totals['orders_delivered'] += 1
+        totals['units_delivered'] += order.quantity
+        totals['revenue'] += order.quantity * unit_prices[order.product_id]
+        totals['delivery_seconds'] += (when - order.created_at).total_seconds()
+    return increments
+
+
+def add_order_rollups(increments):
+    if not increments:
+        return
+    stmt = upsert(OrderDailyRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['day', 'distributor_id', 'product_id'],
+        set_={name: getattr(OrderDailyRollup, name) + getattr(stmt.excluded, name) for name in ROLLUP_COUNTERS}
+    )
+    db.session.execute(stmt, [{
+        'day': day,
+        'distributor_id': distributor_id,
+        'product_id': product_id,
+        **totals
+    } for (day, distributor_id, product_id), totals in increments.items()])
+
+
+def record_placed_orders(orders):
+    # Orders must be flushed so created_at is populated
+    add_order_rollups(rollup_increments(placed=orders))
+
+
+def record_delivered_orders(orders, delivered_at=None):
+    # Each order needs distributor_id, product_id, quantity, created_at and delivered_at
+    orders = list(orders)
+    unit_prices = dict(fetch_in_batches([Product.id, Product.unit_price], Product.id, {o.product_id for o in orders}))
+    add_order_rollups(rollup_increments(delivered=orders, unit_prices=unit_prices, delivered_at=delivered_at))
+
+
+def deliver_orders(orders, delivered_at=None):
+    """Move delivered orders' stock from their distributors to their orderers.
+
+    Each order needs id, distributor_id, orderer_id, product_id, quantity and
+    created_at, plus delivered_at unless it is passed in. Stock for the same
+    distributor and product is decremented once for the whole run. Returns the
+    (distributor_id, product_id) pairs that were short; the caller must roll
+    back if any are.
+    """
+    orders = list(orders)
+    outgoing = {}
+    for order in orders:
+        key = (order.distributor_id, order.product_id)
+        outgoing[key] = outgoing.get(key, 0) + order.quantity
+    
+    short = [key for key, quantity in outgoing.items() if not deduct_stock(*key, quantity)]
+    if short:
+        return short
+    
+    record_movements([{
+        'owner_id': order.distributor_id,
+        'product_id': order.product_id,
+        'delta': -order.quantity,
+        'reason': 'delivery_out',
+        'order_id': order.id
+    } for order in orders])
+    add_stock([{
+        'owner_id': order.orderer_id,
+        'product_id': order.product_id,
+        'delta': order.quantity,
+        'reason': 'delivery_in',
+        'order_id': order.id
+    } for order in orders])
+    record_delivered_orders(orders, delivered_at)
+    return []
+
+
+def rebuild_order_rollups(batch_size=1000):
+    """Recompute every rollup row from the Order table, streaming orders in batches."""
+    db.session.execute(db.delete(OrderDailyRollup))
+    unit_prices = dict(db.session.execute(db.select(Product.id, Product.unit_price)).all())
+    result = db.session.execute(
+        db.select(Order.distributor_id, Order.product_id, Order.quantity, Order.created_at, Order.delivered_at)
+        .execution_options(yield_per=batch_size)
+    )
+    increments = {}
+    for rows in result.partitions():
+        batch = rollup_increments(
+            placed=rows,
+            delivered=[row for row in rows if row.delivered_at is not None],
+            unit_prices=unit_prices
+        )
+        for key, totals in batch.items():
+            merged = increments.setdefault(key, dict.fromkeys(ROLLUP_COUNTERS, 0))
+            for name, value in totals.items():
+                merged[name] += value
+    add_order_rollups(increments)
 
 # Routes
+def serialize_stock_request(r, requester):
+    return {
+        'id': r.id,
+        'requester_id': r.requester_id,
+        'requester_name': requester.username,
+        'requester_type': requester.user_type,
+        'name': r.name,
+        'pincode': r.pincode,
+        'mobile': r.mobile,
+        'status': r.status,
+        'created_at': r.created_at.isoformat()
+    }
 
 
-@app.route('/api/requests', methods=['POST'])
+def publish_stock_request(event_type, request_entry, requester):
+    current_app.extensions['events'].publish(
+        ('distributor', request_entry.distributor_id),
+        event_type,
+        serialize_stock_request(request_entry, requester)
+    )
+
+
+@api.route('/api/requests', methods=['POST'])
 def create_stock_request():
     data = request.json
 
@@ -135,14 +670,15 @@ def create_stock_request():
         return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
 
     # Fetch users
-    distributor = User.query.get_or_404(data['distributor_id'])
-    requester = User.query.get_or_404(data['requester_id'])
+    distributor = get_user_identity_or_404(data['distributor_id'])
+    requester = get_user_identity_or_404(data['requester_id'])
 
     # Validate user types
     if distributor.user_type != 'distributor':
         return jsonify({'error': 'Invalid distributor'}), 400
     if requester.user_type not in ['shg', 'pharmacist']:
         return jsonify({'error': 'Requester must be SHG or Pharmacist'}), 400
+    acting_user_id(requester.id)
 
     # Create the stock request
     request_entry = StockRequest(
@@ -156,6 +692,7 @@ def create_stock_request():
 
     db.session.add(request_entry)
     db.session.commit()
+    publish_stock_request('stock_request', request_entry, requester)
 
     return jsonify({
         'id': request_entry.id,
@@ -165,32 +702,97 @@ def create_stock_request():
         'created_at': request_entry.created_at.isoformat()
     }), 201
 
-@app.route('/api/distributor/<int:distributor_id>/requests', methods=['GET'])
+@api.route('/api/distributor/<int:distributor_id>/requests', methods=['GET'])
+@query_budget(2)
 def get_distributor_requests(distributor_id):
-    distributor = User.query.get_or_404(distributor_id)
+    distributor = get_user_identity_or_404(distributor_id)
     if distributor.user_type != 'distributor':
         return jsonify({'error': 'User is not a distributor'}), 400
     
-    requests = StockRequest.query.filter_by(distributor_id=distributor_id).order_by(StockRequest.created_at.desc()).all()
-    return jsonify([{
-        'id': r.id,
-        'requester_id': r.requester_id,
-        'requester_name': r.requester.username,
-        'requester_type': r.requester.user_type,
-        'name': r.name,
-        'pincode': r.pincode,
-        'mobile': r.mobile,
-        'status': r.status,
-        'created_at': r.created_at.isoformat()
-    } for r in requests])
+    query = StockRequest.query.options(joinedload(StockRequest.requester)).filter_by(
+        distributor_id=distributor_id
+    )
+    
+    # Reconnecting clients pass the highest id they have seen and get only newer requests
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            query = query.filter(StockRequest.id > int(since))
+        except ValueError:
+            return jsonify({'error': 'Invalid since'}), 400
+    
+    requests = query.order_by(StockRequest.created_at.desc()).all()
+    return jsonify([serialize_stock_request(r, r.requester) for r in requests])
+
+@api.route('/api/distributor/<int:distributor_id>/requests/stream', methods=['GET'])
+def stream_distributor_requests(distributor_id):
+    distributor = get_user_identity_or_404(distributor_id)
+    if distributor.user_type != 'distributor':
+        return jsonify({'error': 'User is not a distributor'}), 400
+    
+    # Resume after Last-Event-ID (sent by EventSource on reconnect) or ?since=, else start from now
+    resume_from = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        last_id = int(resume_from) if resume_from else db.session.execute(
+            db.select(db.func.max(StockRequest.id)).filter_by(distributor_id=distributor_id)
+        ).scalar() or 0
+    except ValueError:
+        return jsonify({'error': 'Invalid since'}), 400
+    
+    channel = ('distributor', distributor_id)
+    broker = current_app.extensions['events']
+    keepalive = current_app.config['SSE_KEEPALIVE_SECONDS']
+    # Subscribe before the first catch-up query so nothing created in between is lost
+    subscription = broker.subscribe(channel)
+    
+    def catch_up(after_id):
+        # Requests created by other workers, or while the client was disconnected
+        rows = StockRequest.query.options(joinedload(StockRequest.requester)).filter(
+            StockRequest.distributor_id == distributor_id,
+            StockRequest.id > after_id
+        ).order_by(StockRequest.id).limit(500).all()
+        events = [serialize_stock_request(r, r.requester) for r in rows]
+        # Release the connection while the stream is idle
+        db.session.close()
+        return events
+    
+    def generate():
+        nonlocal last_id
+        try:
+            yield 'retry: 3000\n\n'
+            for data in catch_up(last_id):
+                last_id = data['id']
+                yield format_sse('stock_request', data, last_id)
+            while True:
+                try:
+                    event_type, data = subscription.get(timeout=keepalive)
+                except queue.Empty:
+                    for data in catch_up(last_id):
+                        last_id = data['id']
+                        yield format_sse('stock_request', data, last_id)
+                    yield ': keepalive\n\n'
+                    continue
+                if event_type == 'stock_request':
+                    if data['id'] <= last_id:
+                        continue
+                    last_id = data['id']
+                yield format_sse(event_type, data, last_id)
+        finally:
+            broker.unsubscribe(channel, subscription)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
-@app.route('/api/requests/<int:request_id>/respond', methods=['POST'])
+@api.route('/api/requests/<int:request_id>/respond', methods=['POST'])
 def respond_to_request(request_id):
     data = request.json
     if not all(k in data for k in ['product_id', 'quantity']):
         return jsonify({'error': 'Missing required fields'}), 400
     
     request_entry = StockRequest.query.get_or_404(request_id)
+    acting_user_id(request_entry.distributor_id)
     if request_entry.status != 'pending':
         return jsonify({'error': 'Request already responded to'}), 400
     
@@ -209,11 +811,15 @@ def respond_to_request(request_id):
     )
     db.session.add(order)
 
+    db.session.flush()
+    record_placed_orders([order])
+
     # Update request status
     request_entry.status = 'responded'
     request_entry.responded_at = datetime.utcnow()
 
     db.session.commit()
+    publish_stock_request('stock_request_updated', request_entry, get_user_identity_or_404(requester_id))
 
     return jsonify({
         'request_id': request_entry.id,
@@ -224,7 +830,7 @@ def respond_to_request(request_id):
 
 
 # User Management
-@app.route('/api/users', methods=['POST'])
+@api.route('/api/users', methods=['POST'])
 def create_user():
     data = request.json
 
@@ -249,7 +855,8 @@ def create_user():
         pincode=data['pincode'],
         mobile_number=data['mobile_number']
     )
-    user.set_password(data['password'])
+    # Hash in the worker pool rather than on this request thread
+    user.password_hash = current_app.extensions['password_hasher'].hash(data['password'])
 
     db.session.add(user)
     db.session.commit()
@@ -262,31 +869,156 @@ def create_user():
         'mobile_number': user.mobile_number
     }), 201
 
+# Distributor discovery
+def load_distributor_directory():
+    # Served by ix_user_type_pincode
+    rows = db.session.execute(
+        db.select(User.pincode, User.id, User.username).where(User.user_type == 'distributor')
+    ).all()
+    return [(pincode, (user_id, username, pincode)) for pincode, user_id, username in rows]
+
+
+@api.route('/api/distributors', methods=['GET'])
+@query_budget(2)
+def discover_distributors():
+    pincode = (request.args.get('pincode') or '').strip()
+    if not pincode:
+        return jsonify({'error': 'pincode is required'}), 400
+    min_prefix = current_app.config['DISCOVERY_MIN_PREFIX']
+    if not pincode.isdigit() or len(pincode) < min_prefix:
+        return jsonify({'error': f'pincode must be at least {min_prefix} digits'}), 400
+    
+    try:
+        product_id = int(request.args['product_id']) if request.args.get('product_id') else None
+        min_quantity = int(request.args.get('min_quantity', 1))
+    except ValueError:
+        return jsonify({'error': 'product_id and min_quantity must be integers'}), 400
+    limit = parse_page_limit(request.args.get('limit', '20'))
+    if limit is None:
+        return jsonify({'error': 'Invalid limit'}), 400
+    
+    # Exact pincode first, then ever shorter prefixes (nearest pincodes first)
+    levels = current_app.extensions['distributor_directory'].search(
+        pincode, load_distributor_directory, min_prefix
+    )
+    
+    stock = None
+    if product_id is not None:
+        # One stock lookup for every candidate at every level
+        candidate_ids = {entry[0] for _, entries in levels for entry in entries}
+        stock = dict(fetch_in_batches(
+            [Inventory.owner_id, Inventory.quantity], Inventory.owner_id, candidate_ids,
+            criteria=[Inventory.product_id == product_id, Inventory.quantity >= min_quantity]
+        ))
+    
+    for prefix, entries in levels:
+        if stock is not None:
+            entries = [entry for entry in entries if entry[0] in stock]
+        if not entries:
+            continue
+        distributors = []
+        for user_id, username, distributor_pincode in entries[:limit]:
+            distributor = {'id': user_id, 'username': username, 'pincode': distributor_pincode}
+            if stock is not None:
+                distributor['quantity'] = stock[user_id]
+            distributors.append(distributor)
+        return jsonify({
+            'pincode': pincode,
+            'match': 'exact' if prefix == pincode else 'prefix',
+            'matched_prefix': prefix,
+            'distributors': distributors
+        })
+    
+    return jsonify({'pincode': pincode, 'match': None, 'matched_prefix': None, 'distributors': []})
+
+# Authentication
+@api.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(e):
+    response = jsonify({'error': 'Server busy, try again'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+def request_identity():
+    """Claims from the request's bearer token, checked by signature alone; None without a token."""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    tokens = current_app.extensions['tokens']
+    identity = tokens.verify(header[len('Bearer '):]) if tokens else None
+    if identity is None:
+        abort(401)
+    return identity
+
+
+PLACEHOLDER_SECRET_KEYS = {'your-secret-key-here'}
+
+
+def acting_user_id(claimed_id):
+    # A token, when sent, decides who is acting; a body id may only repeat it.
+    # Every route that writes on behalf of a user id goes through here.
+    identity = request_identity()
+    if identity is None:
+        if current_app.config['AUTH_REQUIRED']:
+            abort(401)
+        return claimed_id
+    if claimed_id is not None and claimed_id != identity['id']:
+        abort(403)
+    return identity['id']
+
+
+@api.route('/api/login', methods=['POST'])
+def login():
+    data = request.json
+    if not data or not data.get('username') or not data.get('password'):
+        return jsonify({'error': 'Missing username or password'}), 400
+    
+    user = db.session.execute(
+        db.select(User.id, User.username, User.user_type, User.password_hash).where(User.username == data['username'])
+    ).first()
+    # Unknown usernames are checked against a throwaway hash so both failures cost the same
+    hasher = current_app.extensions['password_hasher']
+    password_hash = user.password_hash if user else hasher.dummy_hash()
+    if not hasher.verify(password_hash, data['password']) or not user:
+        return jsonify({'error': 'Invalid username or password'}), 401
+    
+    tokens = current_app.extensions['tokens']
+    if tokens is None:
+        return jsonify({'error': 'Login is disabled until SECRET_KEY is set'}), 503
+    return jsonify({
+        'token': tokens.issue({'id': user.id, 'user_type': user.user_type}),
+        'expires_in': tokens.max_age,
+        'user': {'id': user.id, 'username': user.username, 'user_type': user.user_type}
+    })
+
+
+@api.route('/api/me', methods=['GET'])
+@query_budget(0)
+def get_me():
+    identity = request_identity()
+    if identity is None:
+        return jsonify({'error': 'Authentication required'}), 401
+    return jsonify(identity)
+
 # Update order status
 
-@app.route('/api/orders/<int:order_id>/status', methods=['PUT'])
+@api.route('/api/orders/<int:order_id>/status', methods=['PUT'])
 def update_order_status(order_id):
     data = request.json
     new_status = data.get('status')
     
-    valid_transitions = {
-        'placed': 'accepted',
-        'accepted': 'dispatched',
-        'dispatched': 'delivered'
-    }
-
     if new_status not in ['accepted', 'dispatched', 'delivered']:
         return jsonify({'error': 'Invalid status'}), 400
 
     order = Order.query.get_or_404(order_id)
     
     # Ensure the user updating is the correct distributor
-    distributor_id = data.get('distributor_id')
+    distributor_id = acting_user_id(data.get('distributor_id'))
     if order.distributor_id != distributor_id:
         return jsonify({'error': 'Unauthorized distributor'}), 403
     
     current_status = order.status
-    expected_next = valid_transitions.get(current_status)
+    expected_next = ORDER_TRANSITIONS.get(current_status)
 
     if expected_next != new_status:
         return jsonify({
@@ -294,49 +1026,15 @@ def update_order_status(order_id):
         }), 400
     
     # --- Handle each transition ---
-    if new_status == 'accepted':
-        order.status = 'accepted'
-        order.accepted_at = datetime.utcnow()
+    if not claim_order_status(order, [current_status], new_status, f'{new_status}_at'):
+        db.session.rollback()
+        return jsonify({'error': 'Order status changed concurrently'}), 409
     
-    elif new_status == 'dispatched':
-        order.status = 'dispatched'
-        order.dispatched_at = datetime.utcnow()
-    
-    elif new_status == 'delivered':
-        order.status = 'delivered'
-        order.delivered_at = datetime.utcnow()
-
+    if new_status == 'delivered':
         # Deduct distributor inventory + add to SHG/Pharmacist
-        distributor_inv = DistributorInventory.query.filter_by(
-            distributor_id=order.distributor_id,
-            product_id=order.product_id
-        ).first()
-        
-        if not distributor_inv or distributor_inv.quantity < order.quantity:
+        if deliver_orders([order]):
+            db.session.rollback()
             return jsonify({'error': 'Insufficient distributor inventory'}), 400
-        
-        distributor_inv.quantity -= order.quantity
-        orderer = order.orderer
-
-        if orderer.user_type == 'shg':
-            inv = SHGInventory.query.filter_by(
-                shg_id=order.orderer_id, product_id=order.product_id
-            ).first()
-            if inv: inv.quantity += order.quantity
-            else:
-                db.session.add(SHGInventory(
-                    shg_id=order.orderer_id, product_id=order.product_id, quantity=order.quantity
-                ))
-
-        elif orderer.user_type == 'pharmacist':
-            inv = PharmacistInventory.query.filter_by(
-                pharmacist_id=order.orderer_id, product_id=order.product_id
-            ).first()
-            if inv: inv.quantity += order.quantity
-            else:
-                db.session.add(PharmacistInventory(
-                    pharmacist_id=order.orderer_id, product_id=order.product_id, quantity=order.quantity
-                ))
 
     db.session.commit()
 
@@ -349,22 +1047,117 @@ def update_order_status(order_id):
     }), 200
 
 
-@app.route('/api/users', methods=['GET'])
+@api.route('/api/orders/status', methods=['PUT'])
+def bulk_update_order_status():
+    data = request.json
+    new_status = data.get('status')
+    distributor_id = acting_user_id(data.get('distributor_id'))
+    order_ids = data.get('order_ids')
+    
+    if new_status not in ['accepted', 'dispatched', 'delivered']:
+        return jsonify({'error': 'Invalid status'}), 400
+    if not isinstance(order_ids, list) or not order_ids:
+        return jsonify({'error': 'order_ids must be a non-empty list'}), 400
+    if not all(type(order_id) is int for order_id in order_ids):
+        return jsonify({'error': 'order_ids must be integers'}), 400
+    
+    previous_status = next(s for s, n in ORDER_TRANSITIONS.items() if n == new_status)
+    order_ids = list(dict.fromkeys(order_ids))
+    
+    # Validate the state machine for every order at once
+    orders = {o.id: o for o in fetch_in_batches(
+        [Order.id, Order.distributor_id, Order.orderer_id, Order.product_id, Order.quantity, Order.status,
+         Order.created_at],
+        Order.id, order_ids
+    )}
+    errors = []
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        if order is None:
+            errors.append({'order_id': order_id, 'error': 'Order not found'})
+        elif order.distributor_id != distributor_id:
+            errors.append({'order_id': order_id, 'error': 'Unauthorized distributor'})
+        elif order.status != previous_status:
+            errors.append({
+                'order_id': order_id,
+                'error': f'Invalid transition. You can only move from {order.status} → {ORDER_TRANSITIONS.get(order.status)}'
+            })
+    if errors:
+        return jsonify({'errors': errors}), 400
+    
+    # Move every order in one UPDATE; a concurrent change to any of them aborts the run
+    now = datetime.utcnow()
+    updated = 0
+    for i in range(0, len(order_ids), 500):
+        updated += db.session.execute(
+            db.update(Order)
+            .where(Order.id.in_(order_ids[i:i + 500]), Order.status == previous_status)
+            .values(status=new_status, **{f'{new_status}_at': now})
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    if updated != len(order_ids):
+        db.session.rollback()
+        return jsonify({'error': 'Order status changed concurrently'}), 409
+    
+    if new_status == 'delivered':
+        short = deliver_orders(orders.values(), delivered_at=now)
+        if short:
+            db.session.rollback()
+            return jsonify({'error': 'Insufficient distributor inventory',
+                            'product_ids': sorted(product_id for _, product_id in short)}), 400
+    
+    db.session.commit()
+    
+    return jsonify({
+        'status': new_status,
+        'order_ids': order_ids,
+        f'{new_status}_at': now.isoformat()
+    }), 200
+
+
+USER_FIELDS = {
+    'id': Field(User.id),
+    'username': Field(User.username),
+    'user_type': Field(User.user_type),
+}
+
+
+@api.route('/api/users', methods=['GET'])
+@query_budget(1)
 def get_users():
+    try:
+        fields = parse_fields(request.args.get('fields'), USER_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    stmt = projected_select(User, USER_FIELDS, fields)
     user_type = request.args.get('type')
-    query = User.query
     if user_type:
-        query = query.filter_by(user_type=user_type)
+        stmt = stmt.where(User.user_type == user_type)
     
-    users = query.all()
-    return jsonify([{
-        'id': u.id,
-        'username': u.username,
-        'user_type': u.user_type
-    } for u in users])
+    serialize = row_serializer(USER_FIELDS, fields)
+    return jsonify([serialize(row) for row in db.session.execute(stmt)])
+
+# Product catalog cache
+def serialize_product(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'description': product.description,
+        'unit_price': product.unit_price
+    }
+
+
+def cached_json_response(key, build):
+    body, etag = current_app.extensions['product_cache'].get(key, lambda: current_app.json.dumps(build()).encode())
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Turns the response into a 304 Not Modified when If-None-Match matches
+    return response.make_conditional(request)
 
 # Product Management
-@app.route('/api/products', methods=['POST'])
+@api.route('/api/products', methods=['POST'])
 def create_product():
     data = request.json
     if not data.get('name') or not data.get('unit_price'):
@@ -378,107 +1171,430 @@ def create_product():
     db.session.add(product)
     db.session.commit()
     
-    return jsonify({
-        'id': product.id,
-        'name': product.name,
-        'description': product.description,
-        'unit_price': product.unit_price
-    }), 201
+    return jsonify(serialize_product(product)), 201
 
-@app.route('/api/products', methods=['GET'])
+@api.route('/api/products', methods=['GET'])
+@query_budget(1)
 def get_products():
-    products = Product.query.all()
-    return jsonify([{
-        'id': p.id,
-        'name': p.name,
-        'description': p.description,
-        'unit_price': p.unit_price
-    } for p in products])
+    return cached_json_response('products', lambda: [serialize_product(p) for p in Product.query.all()])
 
-@app.route('/api/products/<int:product_id>', methods=['GET'])
+@api.route('/api/products/<int:product_id>', methods=['GET'])
 def get_product(product_id):
-    product = Product.query.get_or_404(product_id)
-    return jsonify({
-        'id': product.id,
-        'name': product.name,
-        'description': product.description,
-        'unit_price': product.unit_price
-    })
+    return cached_json_response(
+        ('product', product_id),
+        lambda: serialize_product(Product.query.get_or_404(product_id))
+    )
+
+def fts_query(q):
+    # Quote every term so user input can't use FTS syntax; the last one
+    # matches as a prefix for search-as-you-type
+    terms = re.findall(r'\w+', q)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+
+def product_search_select(q):
+    columns = [Product.id, Product.name, Product.description, Product.unit_price]
+    if db.engine.dialect.name == 'sqlite':
+        match = fts_query(q)
+        if match is None:
+            return None, None
+        rank = product_fts.c.rank
+        return db.select(*columns, rank).join_from(
+            product_fts, Product, Product.id == product_fts.c.rowid
+        ).where(product_fts.c.product_fts.match(match)), rank
+    # No FTS5 elsewhere: unranked substring match
+    rank = db.literal(0.0)
+    pattern = f'%{q}%'
+    return db.select(*columns, rank).where(
+        db.or_(Product.name.ilike(pattern), Product.description.ilike(pattern))
+    ), rank
+
+
+@api.route('/api/products/search', methods=['GET'])
+@query_budget(1)
+def search_products():
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return jsonify({'error': 'q is required'}), 400
+    stmt, rank = product_search_select(q)
+    if stmt is None:
+        return jsonify([])
+    
+    # Best match first, keyset paginated on (rank, id)
+    page_limit = parse_page_limit(request.args.get('limit', '20'))
+    if page_limit is None:
+        return jsonify({'error': 'Invalid limit'}), 400
+    after = request.args.get('after')
+    if after:
+        try:
+            after_rank, after_id = after.split('|')
+            after_rank, after_id = float(after_rank), int(after_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        stmt = stmt.where(db.or_(rank > after_rank, db.and_(rank == after_rank, Product.id > after_id)))
+    
+    rows = db.session.execute(stmt.order_by(rank, Product.id).limit(page_limit + 1)).all()
+    
+    response = jsonify([serialize_product(row) for row in rows[:page_limit]])
+    if len(rows) > page_limit:
+        last = rows[page_limit - 1]
+        response.headers['X-Next-Cursor'] = f'{last[-1]!r}|{last.id}'
+    return response
 
 # Distributor Inventory Management
-@app.route('/api/distributor/inventory', methods=['POST'])
+@api.route('/api/distributor/inventory', methods=['POST'])
 def set_distributor_inventory():
     data = request.json
     if not all(k in data for k in ['distributor_id', 'product_id', 'quantity']):
         return jsonify({'error': 'Missing required fields'}), 400
     
-    distributor = User.query.get_or_404(data['distributor_id'])
+    distributor = get_user_identity_or_404(data['distributor_id'])
     if distributor.user_type != 'distributor':
         return jsonify({'error': 'User is not a distributor'}), 400
+    acting_user_id(distributor.id)
     
     Product.query.get_or_404(data['product_id'])
     
-    inventory = DistributorInventory.query.filter_by(
-        distributor_id=data['distributor_id'],
-        product_id=data['product_id']
-    ).first()
+    set_stock({(distributor.id, int(data['product_id'])): int(data['quantity'])})
+    inventory = Inventory.query.filter_by(owner_id=distributor.id, product_id=data['product_id']).one()
+    db.session.commit()
+    
+    return jsonify({
+        'id': inventory.id,
+        'distributor_id': inventory.owner_id,
+        'product_id': inventory.product_id,
+        'quantity': inventory.quantity
+    })
+
+@api.route('/api/distributor/thresholds', methods=['POST'])
+def set_reorder_threshold():
+    data = request.json
+    if not all(k in data for k in ['distributor_id', 'product_id', 'threshold']):
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    distributor = get_user_identity_or_404(data['distributor_id'])
+    if distributor.user_type != 'distributor':
+        return jsonify({'error': 'User is not a distributor'}), 400
+    acting_user_id(distributor.id)
+    
+    Product.query.get_or_404(data['product_id'])
+    product_id = int(data['product_id'])
     
-    if inventory:
-        inventory.quantity = int(data['quantity'])
-        inventory.updated_at = datetime.utcnow()
+    # A null threshold removes it and resolves any open alert
+    threshold = data['threshold']
+    if threshold is None:
+        db.session.execute(db.delete(ReorderThreshold).where(
+            ReorderThreshold.owner_id == distributor.id, ReorderThreshold.product_id == product_id
+        ))
+        resolve_stock_alerts(db.and_(StockAlert.owner_id == distributor.id, StockAlert.product_id == product_id))
     else:
-        inventory = DistributorInventory(
-            distributor_id=data['distributor_id'],
-            product_id=data['product_id'],
-            quantity=int(data['quantity'])
-        )
-        db.session.add(inventory)
+        try:
+            threshold = int(threshold)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'threshold must be an integer'}), 400
+        if threshold < 0:
+            return jsonify({'error': 'threshold must not be negative'}), 400
+        stmt = upsert(ReorderThreshold)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['owner_id', 'product_id'],
+            set_={'threshold': stmt.excluded.threshold}
+        ), {'owner_id': distributor.id, 'product_id': product_id, 'threshold': threshold})
+    mark_stock_changed([(distributor.id, product_id)])
+    db.session.commit()
+    
+    alert = db.session.execute(db.select(StockAlert.id).where(
+        StockAlert.owner_id == distributor.id, StockAlert.product_id == product_id, StockAlert.resolved_at.is_(None)
+    )).scalar()
+    return jsonify({
+        'distributor_id': distributor.id,
+        'product_id': product_id,
+        'threshold': threshold,
+        'alert_id': alert
+    })
+
+
+@api.route('/api/distributor/<int:distributor_id>/alerts', methods=['GET'])
+@query_budget(2)
+def get_stock_alerts(distributor_id):
+    distributor = get_user_identity_or_404(distributor_id)
+    if distributor.user_type != 'distributor':
+        return jsonify({'error': 'User is not a distributor'}), 400
+    
+    # Active alerts only, newest first, keyset paginated on id
+    page_limit = parse_page_limit(request.args.get('limit', str(DEFAULT_PAGE_LIMIT)))
+    if page_limit is None:
+        return jsonify({'error': 'Invalid limit'}), 400
+    stmt = db.select(
+        StockAlert.id, StockAlert.product_id, Product.name, StockAlert.threshold, StockAlert.quantity,
+        Inventory.quantity.label('current_quantity'), StockAlert.created_at
+    ).join(Product, Product.id == StockAlert.product_id).outerjoin(
+        Inventory, db.and_(Inventory.owner_id == StockAlert.owner_id, Inventory.product_id == StockAlert.product_id)
+    ).where(StockAlert.owner_id == distributor_id, StockAlert.resolved_at.is_(None))
+    after = request.args.get('after')
+    if after:
+        if not after.isdigit():
+            return jsonify({'error': 'Invalid cursor'}), 400
+        stmt = stmt.where(StockAlert.id < int(after))
+    
+    alerts = db.session.execute(stmt.order_by(StockAlert.id.desc()).limit(page_limit + 1)).all()
+    
+    response = jsonify([{
+        'id': a.id,
+        'product_id': a.product_id,
+        'product_name': a.name,
+        'threshold': a.threshold,
+        'quantity_at_alert': a.quantity,
+        'quantity': a.current_quantity or 0,
+        'created_at': a.created_at.isoformat()
+    } for a in alerts[:page_limit]])
+    if len(alerts) > page_limit:
+        response.headers['X-Next-Cursor'] = str(alerts[page_limit - 1].id)
+    return response
+
+def read_bulk_rows(stream, content_type):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    if 'csv' in content_type:
+        for line_no, row in enumerate(csv.DictReader(text), start=2):
+            yield line_no, row
+    else:
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_no, None
+                continue
+            yield line_no, row
+
+
+def row_int(value):
+    # CSV cells are strings and NDJSON values are numbers; neither may be fractional
+    if isinstance(value, (bool, float)):
+        raise ValueError(value)
+    return int(value)
+
+
+@api.route('/api/distributor/inventory/bulk', methods=['POST'])
+def bulk_set_distributor_inventory():
+    content_type = request.mimetype or ''
+    if 'csv' not in content_type and 'ndjson' not in content_type and 'jsonl' not in content_type:
+        return jsonify({'error': 'Body must be text/csv or application/x-ndjson'}), 415
+    
+    # Parse the streamed body, collecting per-row format errors
+    rows = []
+    errors = []
+    try:
+        for line_no, row in read_bulk_rows(request.stream, content_type):
+            if not isinstance(row, dict):
+                errors.append({'row': line_no, 'error': 'Invalid row'})
+                continue
+            if not all(row.get(k) not in (None, '') for k in ['distributor_id', 'product_id', 'quantity']):
+                errors.append({'row': line_no, 'error': 'Missing required fields'})
+                continue
+            try:
+                rows.append((line_no, row_int(row['distributor_id']), row_int(row['product_id']), row_int(row['quantity'])))
+            except (TypeError, ValueError):
+                errors.append({'row': line_no, 'error': 'Fields must be integers'})
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Body must be UTF-8 encoded'}), 400
+    
+    for distributor_id in {r[1] for r in rows}:
+        acting_user_id(distributor_id)
+    
+    # Validate all referenced users and products in batch
+    user_types = dict(fetch_in_batches([User.id, User.user_type], User.id, {r[1] for r in rows}))
+    product_ids = {p for (p,) in fetch_in_batches([Product.id], Product.id, {r[2] for r in rows})}
+    
+    values = {}
+    applied = 0
+    for line_no, distributor_id, product_id, quantity in rows:
+        if distributor_id not in user_types:
+            errors.append({'row': line_no, 'error': 'Distributor not found'})
+        elif user_types[distributor_id] != 'distributor':
+            errors.append({'row': line_no, 'error': 'User is not a distributor'})
+        elif product_id not in product_ids:
+            errors.append({'row': line_no, 'error': 'Product not found'})
+        elif quantity < 0:
+            errors.append({'row': line_no, 'error': 'Quantity must not be negative'})
+        else:
+            # A later row for the same product wins, as it did row by row
+            values[(distributor_id, product_id)] = quantity
+            applied += 1
+    
+    # Apply every valid row in one transaction
+    if values:
+        set_stock(values)
+        db.session.commit()
+    
+    return jsonify({
+        'applied': applied,
+        'errors': sorted(errors, key=lambda e: e['row'])
+    })
+
+@api.route('/api/inventory/adjust', methods=['POST'])
+def adjust_inventory():
+    data = request.json
+    if not all(k in data for k in ['owner_id', 'product_id', 'delta']):
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    owner = get_user_identity_or_404(data['owner_id'])
+    if owner.user_type not in INVENTORY_OWNER_TYPES:
+        return jsonify({'error': 'User does not hold inventory'}), 400
+    acting_user_id(owner.id)
+    Product.query.get_or_404(data['product_id'])
     
+    try:
+        delta = int(data['delta'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'delta must be an integer'}), 400
+    if delta == 0:
+        return jsonify({'error': 'delta must not be zero'}), 400
+    
+    movement = {
+        'owner_id': owner.id,
+        'product_id': int(data['product_id']),
+        'delta': delta,
+        'reason': 'adjustment',
+        'note': data.get('note')
+    }
+    if delta > 0:
+        add_stock([movement])
+    else:
+        if not deduct_stock(owner.id, movement['product_id'], -delta):
+            db.session.rollback()
+            return jsonify({'error': 'Insufficient inventory'}), 400
+        record_movements([movement])
+    
+    inventory = Inventory.query.filter_by(owner_id=owner.id, product_id=movement['product_id']).one()
     db.session.commit()
     
     return jsonify({
         'id': inventory.id,
-        'distributor_id': inventory.distributor_id,
+        'owner_id': inventory.owner_id,
         'product_id': inventory.product_id,
         'quantity': inventory.quantity
     })
 
-@app.route('/api/distributor/<int:distributor_id>/inventory', methods=['GET'])
+
+@api.route('/api/inventory/<int:owner_id>/movements', methods=['GET'])
+@query_budget(2)
+def get_inventory_movements(owner_id):
+    get_user_identity_or_404(owner_id)
+    
+    stmt = db.select(InventoryMovement).where(InventoryMovement.owner_id == owner_id)
+    product_id = request.args.get('product_id')
+    if product_id:
+        if not product_id.isdigit():
+            return jsonify({'error': 'Invalid product_id'}), 400
+        stmt = stmt.where(InventoryMovement.product_id == int(product_id))
+    
+    # Newest first, keyset paginated on id
+    page_limit = parse_page_limit(request.args.get('limit', str(DEFAULT_PAGE_LIMIT)))
+    if page_limit is None:
+        return jsonify({'error': 'Invalid limit'}), 400
+    after = request.args.get('after')
+    if after:
+        if not after.isdigit():
+            return jsonify({'error': 'Invalid cursor'}), 400
+        stmt = stmt.where(InventoryMovement.id < int(after))
+    
+    movements = db.session.execute(
+        stmt.order_by(InventoryMovement.id.desc()).limit(page_limit + 1)
+    ).scalars().all()
+    
+    response = jsonify([{
+        'id': m.id,
+        'product_id': m.product_id,
+        'delta': m.delta,
+        'reason': m.reason,
+        'order_id': m.order_id,
+        'note': m.note,
+        'created_at': m.created_at.isoformat()
+    } for m in movements[:page_limit]])
+    if len(movements) > page_limit:
+        response.headers['X-Next-Cursor'] = str(movements[page_limit - 1].id)
+    return response
+
+# Rows committed slightly after the watermark was taken can carry an earlier
+# updated_at, so delta queries look back this far and clients apply rows idempotently
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def parse_timestamp(value):
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def inventory_response(owner_id, serialize):
+    query = Inventory.query.options(joinedload(Inventory.product)).filter(Inventory.owner_id == owner_id)
+    
+    changed_since = request.args.get('changed_since')
+    if changed_since is None:
+        return jsonify([serialize(i) for i in query.all()])
+    
+    # Delta sync: only rows changed since the client's last watermark, plus deletions
+    try:
+        since = parse_timestamp(changed_since) - SYNC_OVERLAP
+    except ValueError:
+        return jsonify({'error': 'Invalid changed_since'}), 400
+    
+    watermark = datetime.utcnow()
+    items = query.filter(Inventory.updated_at > since).all()
+    deleted = db.session.execute(
+        db.select(InventoryTombstone.product_id, InventoryTombstone.deleted_at).where(
+            InventoryTombstone.owner_id == owner_id,
+            InventoryTombstone.deleted_at > since
+        )
+    ).all()
+    
+    return jsonify({
+        'items': [serialize(i) for i in items],
+        'deleted': [{'product_id': product_id, 'deleted_at': deleted_at.isoformat()}
+                    for product_id, deleted_at in deleted],
+        'watermark': watermark.isoformat()
+    })
+
+@api.route('/api/distributor/<int:distributor_id>/inventory', methods=['GET'])
+@query_budget(3)
 def get_distributor_inventory(distributor_id):
-    distributor = User.query.get_or_404(distributor_id)
+    distributor = get_user_identity_or_404(distributor_id)
     if distributor.user_type != 'distributor':
         return jsonify({'error': 'User is not a distributor'}), 400
     
-    inventory = DistributorInventory.query.filter_by(distributor_id=distributor_id).all()
-    
-    return jsonify([{
+    return inventory_response(distributor_id, lambda i: {
         'id': i.id,
         'product_id': i.product_id,
         'product_name': i.product.name,
         'unit_price': i.product.unit_price,
         'quantity': i.quantity,
         'updated_at': i.updated_at.isoformat()
-    } for i in inventory])
+    })
 
 # Order Management
-@app.route('/api/orders', methods=['POST'])
+@api.route('/api/orders', methods=['POST'])
 def place_order():
     data = request.json
     if not all(k in data for k in ['distributor_id', 'orderer_id', 'product_id', 'quantity']):
         return jsonify({'error': 'Missing required fields'}), 400
     
-    distributor = User.query.get_or_404(data['distributor_id'])
-    orderer = User.query.get_or_404(data['orderer_id'])
+    distributor = get_user_identity_or_404(data['distributor_id'])
+    orderer = get_user_identity_or_404(data['orderer_id'])
     
     if distributor.user_type != 'distributor':
         return jsonify({'error': 'Invalid distributor'}), 400
     
     if orderer.user_type not in ['shg', 'pharmacist']:
         return jsonify({'error': 'Orderer must be SHG or Pharmacist'}), 400
+    acting_user_id(orderer.id)
     
     # Check distributor inventory
-    inventory = DistributorInventory.query.filter_by(
-        distributor_id=data['distributor_id'],
+    inventory = Inventory.query.filter_by(
+        owner_id=data['distributor_id'],
         product_id=data['product_id']
     ).first()
     
@@ -493,6 +1609,8 @@ def place_order():
         status='placed'
     )
     db.session.add(order)
+    db.session.flush()
+    record_placed_orders([order])
     db.session.commit()
     
     return jsonify({
@@ -505,62 +1623,109 @@ def place_order():
         'created_at': order.created_at.isoformat()
     }), 201
 
-@app.route('/api/orders/<int:order_id>/deliver', methods=['PUT'])
+@api.route('/api/orders/batch', methods=['POST'])
+def place_orders_batch():
+    data = request.json
+    items = data.get('orders') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a non-empty list of orders'}), 400
+    
+    # Validate the shape of every line item first
+    errors = []
+    lines = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not all(k in item for k in ['distributor_id', 'orderer_id', 'product_id', 'quantity']):
+            errors.append({'index': index, 'error': 'Missing required fields'})
+            continue
+        try:
+            lines.append((index, int(item['distributor_id']), int(item['orderer_id']),
+                          int(item['product_id']), int(item['quantity'])))
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'error': 'Fields must be integers'})
+    
+    for orderer_id in {l[2] for l in lines}:
+        acting_user_id(orderer_id)
+    
+    # Resolve users, products and inventory with a few IN (...) queries
+    user_ids = {l[1] for l in lines} | {l[2] for l in lines}
+    user_types = dict(fetch_in_batches([User.id, User.user_type], User.id, user_ids))
+    product_ids = {p for (p,) in fetch_in_batches([Product.id], Product.id, {l[3] for l in lines})}
+    pairs = list({(l[1], l[3]) for l in lines})
+    stock = {}
+    for i in range(0, len(pairs), 500):
+        stock.update(((distributor_id, product_id), quantity) for distributor_id, product_id, quantity in db.session.execute(
+            db.select(Inventory.owner_id, Inventory.product_id, Inventory.quantity)
+            .where(pairs_clause(Inventory, pairs[i:i + 500]))
+        ).all())
+    
+    # Check inventory against the total requested per (distributor, product) in this batch
+    requested = {}
+    for _, distributor_id, _, product_id, quantity in lines:
+        requested[(distributor_id, product_id)] = requested.get((distributor_id, product_id), 0) + quantity
+    
+    for index, distributor_id, orderer_id, product_id, quantity in lines:
+        if distributor_id not in user_types or orderer_id not in user_types:
+            errors.append({'index': index, 'error': 'User not found'})
+        elif user_types[distributor_id] != 'distributor':
+            errors.append({'index': index, 'error': 'Invalid distributor'})
+        elif user_types[orderer_id] not in ['shg', 'pharmacist']:
+            errors.append({'index': index, 'error': 'Orderer must be SHG or Pharmacist'})
+        elif product_id not in product_ids:
+            errors.append({'index': index, 'error': 'Product not found'})
+        elif quantity <= 0:
+            errors.append({'index': index, 'error': 'Quantity must be positive'})
+        elif stock.get((distributor_id, product_id), 0) < requested[(distributor_id, product_id)]:
+            errors.append({'index': index, 'error': 'Insufficient inventory'})
+    
+    # The batch is all-or-nothing
+    if errors:
+        return jsonify({'errors': sorted(errors, key=lambda e: e['index'])}), 400
+    
+    orders = [Order(
+        distributor_id=distributor_id,
+        orderer_id=orderer_id,
+        product_id=product_id,
+        quantity=quantity,
+        status='placed'
+    ) for _, distributor_id, orderer_id, product_id, quantity in lines]
+    db.session.add_all(orders)
+    db.session.flush()
+    record_placed_orders(orders)
+    db.session.commit()
+    
+    return jsonify([{
+        'id': order.id,
+        'distributor_id': order.distributor_id,
+        'orderer_id': order.orderer_id,
+        'product_id': order.product_id,
+        'quantity': order.quantity,
+        'status': order.status,
+        'created_at': order.created_at.isoformat()
+    } for order in orders]), 201
+
+@api.route('/api/orders/<int:order_id>/deliver', methods=['PUT'])
 def deliver_order(order_id):
+    data = request.get_json(silent=True) or {}
     order = Order.query.get_or_404(order_id)
     
+    # Only the order's distributor can deliver it. Tokenless clients that
+    # name no distributor are trusted, as before, unless AUTH_REQUIRED is set.
+    distributor_id = acting_user_id(data.get('distributor_id'))
+    if distributor_id is not None and order.distributor_id != distributor_id:
+        return jsonify({'error': 'Unauthorized distributor'}), 403
+    
     if order.status == 'delivered':
         return jsonify({'error': 'Order already delivered'}), 400
     
-    # Deduct from distributor inventory
-    distributor_inv = DistributorInventory.query.filter_by(
-        distributor_id=order.distributor_id,
-        product_id=order.product_id
-    ).first()
+    if not claim_order_status(order, ['placed', 'accepted', 'dispatched'], 'delivered', 'delivered_at'):
+        db.session.rollback()
+        return jsonify({'error': 'Order already delivered'}), 400
     
-    if not distributor_inv or distributor_inv.quantity < order.quantity:
+    # Deduct from distributor inventory and add to orderer inventory
+    if deliver_orders([order]):
+        db.session.rollback()
         return jsonify({'error': 'Insufficient distributor inventory'}), 400
     
-    distributor_inv.quantity -= order.quantity
-    
-    # Add to orderer inventory
-    orderer = User.query.get(order.orderer_id)
-    
-    if orderer.user_type == 'shg':
-        orderer_inv = SHGInventory.query.filter_by(
-            shg_id=order.orderer_id,
-            product_id=order.product_id
-        ).first()
-        
-        if orderer_inv:
-            orderer_inv.quantity += order.quantity
-        else:
-            orderer_inv = SHGInventory(
-                shg_id=order.orderer_id,
-                product_id=order.product_id,
-                quantity=order.quantity
-            )
-            db.session.add(orderer_inv)
-    
-    elif orderer.user_type == 'pharmacist':
-        orderer_inv = PharmacistInventory.query.filter_by(
-            pharmacist_id=order.orderer_id,
-            product_id=order.product_id
-        ).first()
-        
-        if orderer_inv:
-            orderer_inv.quantity += order.quantity
-        else:
-            orderer_inv = PharmacistInventory(
-                pharmacist_id=order.orderer_id,
-                product_id=order.product_id,
-                quantity=order.quantity
-            )
-            db.session.add(orderer_inv)
-    
-    order.status = 'delivered'
-    order.delivered_at = datetime.utcnow()
-    
     db.session.commit()
     
     return jsonify({
@@ -569,76 +1734,479 @@ def deliver_order(order_id):
         'delivered_at': order.delivered_at.isoformat()
     })
 
-@app.route('/api/orders', methods=['GET'])
-def get_orders():
-    distributor_id = request.args.get('distributor_id')
-    orderer_id = request.args.get('orderer_id')
+# Keyset pagination helpers
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def parse_page_limit(value):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return None
+    if limit < 1:
+        return None
+    return min(limit, MAX_PAGE_LIMIT)
+
+
+OrderDistributor = aliased(User)
+OrderOrderer = aliased(User)
+ORDER_DISTRIBUTOR_JOIN = (OrderDistributor, OrderDistributor.id == Order.distributor_id)
+ORDER_ORDERER_JOIN = (OrderOrderer, OrderOrderer.id == Order.orderer_id)
+ORDER_PRODUCT_JOIN = (Product, Product.id == Order.product_id)
+
+ORDER_FIELDS = {
+    'id': Field(Order.id),
+    'distributor_id': Field(Order.distributor_id),
+    'distributor_name': Field(OrderDistributor.username, join=ORDER_DISTRIBUTOR_JOIN),
+    'orderer_id': Field(Order.orderer_id),
+    'orderer_name': Field(OrderOrderer.username, join=ORDER_ORDERER_JOIN),
+    'orderer_type': Field(OrderOrderer.user_type, join=ORDER_ORDERER_JOIN),
+    'product_id': Field(Order.product_id),
+    'product_name': Field(Product.name, join=ORDER_PRODUCT_JOIN),
+    'quantity': Field(Order.quantity),
+    'status': Field(Order.status),
+    'created_at': Field(Order.created_at, format=isoformat),
+    'delivered_at': Field(Order.delivered_at, format=isoformat),
+}
+
+
+def id_arg(name):
+    # Optional integer id filter from the query string; ValueError names the bad argument
+    value = request.args.get(name)
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValueError(f'Invalid {name}')
+    return int(value)
+
+
+def filter_orders(stmt):
+    distributor_id = id_arg('distributor_id')
+    orderer_id = id_arg('orderer_id')
     status = request.args.get('status')
     
-    query = Order.query
-    
-    if distributor_id:
-        query = query.filter_by(distributor_id=int(distributor_id))
-    if orderer_id:
-        query = query.filter_by(orderer_id=int(orderer_id))
+    if distributor_id is not None:
+        stmt = stmt.where(Order.distributor_id == distributor_id)
+    if orderer_id is not None:
+        stmt = stmt.where(Order.orderer_id == orderer_id)
     if status:
-        query = query.filter_by(status=status)
+        stmt = stmt.where(Order.status == status)
+    return stmt
+
+
+@api.route('/api/orders', methods=['GET'])
+@query_budget(1)
+def get_orders():
+    limit = request.args.get('limit')
+    after = request.args.get('after')
     
-    orders = query.order_by(Order.created_at.desc()).all()
+    try:
+        fields = parse_fields(request.args.get('fields'), ORDER_FIELDS)
+        # Select plain columns, joining users and products only for the fields asked for.
+        # created_at and id always ride along at the end for the pagination cursor.
+        stmt = filter_orders(projected_select(Order, ORDER_FIELDS, fields, extra=[Order.created_at, Order.id]))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify([{
-        'id': o.id,
-        'distributor_id': o.distributor_id,
-        'distributor_name': o.distributor.username,
-        'orderer_id': o.orderer_id,
-        'orderer_name': o.orderer.username,
-        'orderer_type': o.orderer.user_type,
-        'product_id': o.product_id,
-        'product_name': o.product.name,
-        'quantity': o.quantity,
-        'status': o.status,
-        'created_at': o.created_at.isoformat(),
-        'delivered_at': o.delivered_at.isoformat() if o.delivered_at else None
-    } for o in orders])
-
-# SHG Inventory
-@app.route('/api/shg/<int:shg_id>/inventory', methods=['GET'])
-def get_shg_inventory(shg_id):
-    shg = User.query.get_or_404(shg_id)
-    if shg.user_type != 'shg':
-        return jsonify({'error': 'User is not a SHG'}), 400
+    stmt = stmt.order_by(Order.created_at.desc(), Order.id.desc())
     
-    inventory = SHGInventory.query.filter_by(shg_id=shg_id).all()
+    # Keyset pagination on (created_at, id); only applied when the client asks for it
+    next_cursor = None
+    if limit is not None or after is not None:
+        page_limit = parse_page_limit(limit) if limit is not None else DEFAULT_PAGE_LIMIT
+        if page_limit is None:
+            return jsonify({'error': 'Invalid limit'}), 400
+        
+        if after:
+            position = decode_cursor(after)
+            if position is None:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            stmt = stmt.where(db.tuple_(Order.created_at, Order.id) < position)
+        
+        # Fetch one extra row to know whether another page exists
+        rows = db.session.execute(stmt.limit(page_limit + 1)).all()
+        if len(rows) > page_limit:
+            rows = rows[:page_limit]
+            next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+    else:
+        rows = db.session.execute(stmt).all()
     
-    return jsonify([{
+    serialize = row_serializer(ORDER_FIELDS, fields)
+    response = jsonify([serialize(row) for row in rows])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+def serialize_orderer_inventory(i):
+    return {
         'id': i.id,
         'product_id': i.product_id,
         'product_name': i.product.name,
         'quantity': i.quantity,
         'updated_at': i.updated_at.isoformat()
-    } for i in inventory])
+    }
+
+# SHG Inventory
+@api.route('/api/shg/<int:shg_id>/inventory', methods=['GET'])
+@query_budget(3)
+def get_shg_inventory(shg_id):
+    shg = get_user_identity_or_404(shg_id)
+    if shg.user_type != 'shg':
+        return jsonify({'error': 'User is not a SHG'}), 400
+    
+    return inventory_response(shg_id, serialize_orderer_inventory)
 
 # Pharmacist Inventory
-@app.route('/api/pharmacist/<int:pharmacist_id>/inventory', methods=['GET'])
+@api.route('/api/pharmacist/<int:pharmacist_id>/inventory', methods=['GET'])
+@query_budget(3)
 def get_pharmacist_inventory(pharmacist_id):
-    pharmacist = User.query.get_or_404(pharmacist_id)
+    pharmacist = get_user_identity_or_404(pharmacist_id)
     if pharmacist.user_type != 'pharmacist':
         return jsonify({'error': 'User is not a pharmacist'}), 400
     
-    inventory = PharmacistInventory.query.filter_by(pharmacist_id=pharmacist_id).all()
+    return inventory_response(pharmacist_id, serialize_orderer_inventory)
+
+# Reports
+def parse_report_range():
+    # Inclusive ?from=YYYY-MM-DD&to=YYYY-MM-DD on the rollup day
+    conditions = []
+    for param, compare in [('from', lambda day: OrderDailyRollup.day >= day),
+                           ('to', lambda day: OrderDailyRollup.day <= day)]:
+        value = request.args.get(param)
+        if value:
+            conditions.append(compare(date.fromisoformat(value)))
+    for param in ['distributor_id', 'product_id']:
+        value = request.args.get(param)
+        if value:
+            conditions.append(getattr(OrderDailyRollup, param) == int(value))
+    return conditions
+
+
+def report_totals():
+    delivered = db.func.sum(OrderDailyRollup.orders_delivered)
+    return [
+        db.func.sum(OrderDailyRollup.orders_placed).label('orders_placed'),
+        db.func.sum(OrderDailyRollup.units_placed).label('units_placed'),
+        delivered.label('orders_delivered'),
+        db.func.sum(OrderDailyRollup.units_delivered).label('units_delivered'),
+        db.func.sum(OrderDailyRollup.revenue).label('revenue'),
+        (db.func.sum(OrderDailyRollup.delivery_seconds) / db.func.nullif(delivered, 0)).label('avg_delivery_seconds'),
+    ]
+
+
+def report_response(key_column, name_column=None):
+    try:
+        conditions = parse_report_range()
+    except ValueError:
+        return jsonify({'error': 'Invalid date or id filter'}), 400
     
-    return jsonify([{
-        'id': i.id,
-        'product_id': i.product_id,
-        'product_name': i.product.name,
-        'quantity': i.quantity,
-        'updated_at': i.updated_at.isoformat()
-    } for i in inventory])
+    # GROUP BY over the rollup rows rather than the Order table
+    columns = [key_column] + ([name_column] if name_column is not None else [])
+    stmt = db.select(*columns, *report_totals()).where(*conditions).group_by(key_column).order_by(key_column)
+    rows = [row._asdict() for row in db.session.execute(stmt)]
+    for row in rows:
+        if 'day' in row:
+            row['day'] = row['day'].isoformat()
+    return jsonify(rows)
+
+
+@api.route('/api/reports/distributors', methods=['GET'])
+@query_budget(1)
+def distributor_report():
+    return report_response(
+        OrderDailyRollup.distributor_id,
+        db.select(User.username).where(User.id == OrderDailyRollup.distributor_id)
+        .scalar_subquery().label('distributor_name')
+    )
+
+
+@api.route('/api/reports/products', methods=['GET'])
+@query_budget(1)
+def product_report():
+    return report_response(
+        OrderDailyRollup.product_id,
+        db.select(Product.name).where(Product.id == OrderDailyRollup.product_id)
+        .scalar_subquery().label('product_name')
+    )
+
+
+@api.route('/api/reports/daily', methods=['GET'])
+@query_budget(1)
+def daily_report():
+    return report_response(OrderDailyRollup.day)
+
+# Demand forecasting
+def forecast_reorders(distributor_id=None, lead_time_days=None, cover_days=None, today=None):
+    """Reorder suggestions from the last FORECAST_HISTORY_DAYS complete days of rollups.
+
+    Daily demand comes from the units_placed rollup counter in one query, and
+    stock from one Inventory query; all pairs are forecast together.
+    """
+    np = load_numpy()
+    config = current_app.config
+    end = today or datetime.utcnow().date()
+    start = end - timedelta(days=config['FORECAST_HISTORY_DAYS'])
+    criteria = [OrderDailyRollup.day >= start, OrderDailyRollup.day < end, OrderDailyRollup.units_placed > 0]
+    stock = db.select(Inventory.owner_id, Inventory.product_id, Inventory.quantity)
+    if distributor_id is not None:
+        criteria.append(OrderDailyRollup.distributor_id == distributor_id)
+        stock = stock.where(Inventory.owner_id == distributor_id)
+    else:
+        stock = stock.join(User, User.id == Inventory.owner_id).where(User.user_type == 'distributor')
+    
+    rows = db.session.execute(db.select(
+        OrderDailyRollup.distributor_id, OrderDailyRollup.product_id, OrderDailyRollup.day, OrderDailyRollup.units_placed
+    ).where(*criteria)).all()
+    stock_rows = db.session.execute(stock).all()
+    if not rows:
+        return []
+    distributor_ids, product_ids, days, units = zip(*rows)
+    day_offsets = np.fromiter(map(date.toordinal, days), np.int64, len(days)) - start.toordinal()
+    keys, demand = demand_matrix(distributor_ids, product_ids, day_offsets, units, (end - start).days)
+    
+    # Pairs without an inventory row have nothing on hand
+    on_hand = np.zeros(len(keys))
+    if stock_rows:
+        owner_ids, stock_product_ids, quantities = zip(*stock_rows)
+        stock_keys = pair_keys(owner_ids, stock_product_ids)
+        positions = np.searchsorted(keys, stock_keys).clip(max=len(keys) - 1)
+        found = keys[positions] == stock_keys
+        on_hand[positions[found]] = np.asarray(quantities, dtype=np.float64)[found]
+    
+    suggestions = reorder_suggestions(
+        keys, demand, on_hand,
+        window=config['FORECAST_WINDOW_DAYS'],
+        alpha=config['FORECAST_SMOOTHING'],
+        lead_time_days=config['REORDER_LEAD_TIME_DAYS'] if lead_time_days is None else lead_time_days,
+        cover_days=config['REORDER_COVER_DAYS'] if cover_days is None else cover_days,
+        service_z=config['REORDER_SERVICE_Z']
+    )
+    columns = {name: values.tolist() for name, values in suggestions.items()}
+    return [{
+        'distributor_id': distributor,
+        'product_id': product,
+        'quantity': int(quantity),
+        'forecast_daily_demand': round(forecast, 2),
+        'moving_average': round(average, 2),
+        'smoothed': round(smoothed, 2),
+        'reorder_point': round(reorder_point, 2),
+        'days_of_cover': round(cover, 1),
+        'suggested_quantity': suggested
+    } for distributor, product, quantity, forecast, average, smoothed, reorder_point, cover, suggested in zip(
+        columns['distributor_id'], columns['product_id'], columns['on_hand'], columns['forecast'],
+        columns['moving_average'], columns['smoothed'], columns['reorder_point'], columns['days_of_cover'],
+        columns['suggested_quantity']
+    )]
+
+
+@api.route('/api/distributor/<int:distributor_id>/reorder-suggestions', methods=['GET'])
+@query_budget(3)
+def get_reorder_suggestions(distributor_id):
+    if load_numpy() is None:
+        return jsonify({'error': 'Forecasting requires numpy'}), 501
+    distributor = get_user_identity_or_404(distributor_id)
+    if distributor.user_type != 'distributor':
+        return jsonify({'error': 'User is not a distributor'}), 400
+    
+    try:
+        lead_time_days = int(request.args['lead_time_days']) if 'lead_time_days' in request.args else None
+        cover_days = int(request.args['cover_days']) if 'cover_days' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'lead_time_days and cover_days must be integers'}), 400
+    if any(value is not None and value < 0 for value in (lead_time_days, cover_days)):
+        return jsonify({'error': 'lead_time_days and cover_days must not be negative'}), 400
+    
+    return jsonify(forecast_reorders(distributor_id, lead_time_days, cover_days))
+
+# Exports
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+INVENTORY_PRODUCT_JOIN = (Product, Product.id == Inventory.product_id)
+
+
+def inventory_export_fields(owner_type):
+    return {
+        'id': Field(Inventory.id),
+        f'{owner_type}_id': Field(Inventory.owner_id),
+        'product_id': Field(Inventory.product_id),
+        'product_name': Field(Product.name, join=INVENTORY_PRODUCT_JOIN),
+        'quantity': Field(Inventory.quantity),
+        'updated_at': Field(Inventory.updated_at, format=isoformat),
+    }
+
+
+INVENTORY_EXPORT_FIELDS = {owner_type: inventory_export_fields(owner_type) for owner_type in INVENTORY_OWNER_TYPES}
+
+
+def export_response(stmt, spec, fields, name):
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    serialize = row_serializer(spec, fields)
+    
+    def generate():
+        # yield_per streams rows from the cursor in batches (a server-side cursor on
+        # PostgreSQL), so memory stays flat however large the table is
+        result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(fields)
+            for rows in result.partitions():
+                writer.writerows(serialize(row).values() for row in rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            dumps = current_app.json.dumps
+            for rows in result.partitions():
+                yield ''.join(dumps(serialize(row)) + '\n' for row in rows)
+    
+    response = Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{export_format}'
+    return response
+
+
+@api.route('/api/export/orders', methods=['GET'])
+def export_orders():
+    try:
+        fields = parse_fields(request.args.get('fields'), ORDER_FIELDS)
+        stmt = filter_orders(projected_select(Order, ORDER_FIELDS, fields)).order_by(Order.id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return export_response(stmt, ORDER_FIELDS, fields, 'orders')
+
+
+@api.route('/api/export/<owner_type>/inventory', methods=['GET'])
+def export_inventory(owner_type):
+    if owner_type not in INVENTORY_OWNER_TYPES:
+        return jsonify({'error': 'Unknown inventory type'}), 404
+    
+    spec = INVENTORY_EXPORT_FIELDS[owner_type]
+    try:
+        fields = parse_fields(request.args.get('fields'), spec)
+        owner_id = id_arg(f'{owner_type}_id')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    stmt = projected_select(Inventory, spec, fields).where(
+        Inventory.owner_id.in_(db.select(User.id).where(User.user_type == owner_type))
+    )
+    if owner_id is not None:
+        stmt = stmt.where(Inventory.owner_id == owner_id)
+    return export_response(stmt.order_by(Inventory.id), spec, fields, f'{owner_type}_inventory')
+
 
 # Health check
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy'})
 
+@api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    user_cache = current_app.extensions['user_cache'].stats()
+    body = current_app.extensions['metrics'].render(extra_counters=[
+        ('cache_hits_total', 'Cache lookups served from memory.', [({'cache': 'user'}, user_cache['hits'])]),
+        ('cache_misses_total', 'Cache lookups that went to the database.', [({'cache': 'user'}, user_cache['misses'])]),
+    ])
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create any missing tables. Use `flask db upgrade` for existing databases."""
+    db.create_all()
+    click.echo('Database tables created.')
+
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Recompute the daily order rollups from the Order table."""
+    rebuild_order_rollups()
+    db.session.commit()
+    click.echo('Order rollups rebuilt.')
+
+@click.command('forecast-demand')
+@click.option('--output', type=click.File('w'), default='-', help='CSV destination (default stdout).')
+@with_appcontext
+def forecast_demand_command(output):
+    """Write reorder suggestions for every distributor as CSV."""
+    if load_numpy() is None:
+        raise click.ClickException('Forecasting requires numpy')
+    suggestions = forecast_reorders()
+    fieldnames = ['distributor_id', 'product_id', 'quantity', 'forecast_daily_demand', 'moving_average',
+                  'smoothed', 'reorder_point', 'days_of_cover', 'suggested_quantity']
+    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(suggestions)
+    click.echo(f'{len(suggestions)} reorder suggestion(s).', err=True)
+
+# Application factory
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+
+    # Engines are created here but no connection is opened until the first query
+    db.init_app(app)
+    migrate.init_app(app, db)
+    with app.app_context():
+        pragmas = app.config['SQLITE_PRAGMAS']
+
+        @event.listens_for(db.engine, 'connect')
+        def _on_connect(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+        Metrics().init_app(app, db.engine)
+
+    app.extensions['product_cache'] = ResponseCache(ttl=app.config['PRODUCT_CACHE_TTL'])
+    app.extensions['user_cache'] = LRUCache(maxsize=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL'])
+    app.extensions['events'] = EventBroker()
+    app.extensions['distributor_directory'] = PincodeDirectory(app.config['DISCOVERY_DIRECTORY_TTL'])
+    app.extensions['password_hasher'] = PasswordHasher(app.config['PASSWORD_HASH_WORKERS'],
+                                                       app.config['PASSWORD_HASH_TIMEOUT'])
+    # Tokens are never signed with a missing or well-known key
+    secret_key = app.config['SECRET_KEY']
+    if secret_key and secret_key not in PLACEHOLDER_SECRET_KEYS:
+        app.extensions['tokens'] = TokenSigner(secret_key, app.config['AUTH_TOKEN_MAX_AGE'])
+    elif app.config['AUTH_REQUIRED']:
+        raise RuntimeError('AUTH_REQUIRED=1 needs SECRET_KEY set to a private random value')
+    else:
+        app.extensions['tokens'] = None
+    if orjson is not None and app.config['JSON_FAST']:
+        app.json = OrjsonProvider(app)
+
+    app.register_blueprint(api)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(forecast_demand_command)
+
+    if app.config.get('TRAFFIC_RECORD_PATH'):
+        app.wsgi_app = TrafficRecorder(app.wsgi_app, app.config['TRAFFIC_RECORD_PATH'])
+    return app
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
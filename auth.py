@@ -0,0 +1,95 @@
+"""Password hashing off the request threads, and signed stateless login tokens."""
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+import atexit
+import multiprocessing
+import threading
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when no hashing slot frees up, or a hash does not finish, within the timeout."""
+
+
+class PasswordHasher:
+    """Runs werkzeug's password hashing in a bounded pool of worker processes.
+
+    scrypt costs tens of milliseconds of CPU; in a process pool it neither holds
+    the GIL nor occupies more than ``workers`` cores, and at most ``workers * 2``
+    jobs are in flight so a burst of signups queues here instead of piling up.
+    ``workers=0`` hashes inline, which is handy in tests. The pool is started on
+    first use so importing the app stays cheap; as with any spawned pool, scripts
+    that build the app at import time need an ``if __name__ == '__main__'`` guard.
+    """
+
+    def __init__(self, workers=2, timeout=10):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(workers, 1) * 2)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._dummy_hash = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn rather than fork: the parent has live threads and DB connections
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+                atexit.register(self.shutdown)
+            return self._pool
+
+    def _run(self, fn, *args):
+        if self.workers == 0:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor().submit(fn, *args)
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Drop it if it never started; either way the caller gets a 503, not a 500
+            future.cancel()
+            raise PasswordHasherBusy()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def dummy_hash(self):
+        # Computed once, on first use, to keep startup cheap
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash('not-a-real-password')
+        return self._dummy_hash
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+class TokenSigner:
+    """Issues and checks HMAC-signed, timestamped tokens carrying a user's identity.
+
+    Verification needs only the secret key, so authenticated requests do not
+    touch the database. Tokens cannot be revoked before ``max_age`` runs out.
+    """
+
+    def __init__(self, secret_key, max_age=86400):
+        self.max_age = max_age
+        self._serializer = URLSafeTimedSerializer(secret_key, salt='auth-token')
+
+    def issue(self, claims):
+        return self._serializer.dumps(claims)
+
+    def verify(self, token):
+        """Return the claims in ``token``, or None if it is forged, malformed or expired."""
+        try:
+            return self._serializer.loads(token, max_age=self.max_age)
+        except BadSignature:
+            return None
@@ -0,0 +1,113 @@
+"""Benchmark signup and login throughput with inline vs pooled password hashing.
+
+Runs concurrent signups, then logins, from several threads while one more
+thread polls GET /api/health. With inline hashing the scrypt work competes
+with every other request thread. Also times token checks on GET /api/me,
+which never touch the database.
+
+    python bench_auth.py [--users 100] [--threads 8] [--workers 4]
+"""
+import argparse
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+
+from app import create_app, db
+from metrics import count_queries
+from timing import percentile
+
+
+def timed_concurrently(app, threads, work):
+    """Run work(index) on ``threads`` threads; return elapsed seconds and the health-check p99."""
+    barrier = threading.Barrier(threads + 2)
+    done = threading.Event()
+    latencies = []
+
+    def worker(index):
+        barrier.wait()
+        work(index)
+
+    def probe(client):
+        barrier.wait()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get('/api/health')
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    prober = threading.Thread(target=probe, args=(app.test_client(),))
+    for t in pool + [prober]:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+    return elapsed, percentile(latencies, 99) if latencies else 0.0
+
+
+def bench(workers, args):
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}', 'PASSWORD_HASH_WORKERS': workers,
+                      'SECRET_KEY': secrets.token_hex(32)})
+    with app.app_context():
+        db.create_all()
+    hasher = app.extensions['password_hasher']
+    hasher.hash('warm-up')
+
+    def signup(index):
+        client = app.test_client()
+        for i in range(index, args.users, args.threads):
+            response = client.post('/api/users', json={
+                'username': f'user-{i}', 'password': f'secret-{i}', 'user_type': 'pharmacist',
+                'pincode': '000000', 'mobile_number': '0'
+            })
+            assert response.status_code == 201, response.get_json()
+
+    tokens = [None] * args.users
+
+    def login(index):
+        client = app.test_client()
+        for i in range(index, args.users, args.threads):
+            response = client.post('/api/login', json={'username': f'user-{i}', 'password': f'secret-{i}'})
+            assert response.status_code == 200, response.get_json()
+            tokens[i] = response.get_json()['token']
+
+    signup_time, signup_p99 = timed_concurrently(app, args.threads, signup)
+    login_time, login_p99 = timed_concurrently(app, args.threads, login)
+
+    client = app.test_client()
+    with app.app_context(), count_queries(db.engine) as statements:
+        start = time.perf_counter()
+        for token in tokens:
+            assert client.get('/api/me', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+        me_time = time.perf_counter() - start
+    hasher.shutdown()
+
+    label = f'pool({workers})' if workers else 'inline'
+    print(f'{label:<9} signup {args.users / signup_time:>7.1f}/s (health p99 {signup_p99 * 1000:>6.1f} ms)  '
+          f'login {args.users / login_time:>7.1f}/s (health p99 {login_p99 * 1000:>6.1f} ms)  '
+          f'/api/me {args.users / me_time:>7.0f}/s, {len(statements)} SQL')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    print(f'{args.users} users, {args.threads} client threads, {os.cpu_count()} CPUs')
+    bench(0, args)
+    bench(args.workers, args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
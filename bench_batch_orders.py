@@ -0,0 +1,61 @@
+"""Benchmark POST /api/orders/batch against one POST /api/orders per line item.
+
+    python bench_batch_orders.py [--orders 2000] [--batch-size 50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from app import create_app, db, User, Product, set_stock
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--products', type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+
+    with app.app_context():
+        db.create_all()
+        distributor = User(username='bench-distributor', user_type='distributor', pincode='000000',
+                           mobile_number='0', password_hash='-')
+        pharmacist = User(username='bench-pharmacist', user_type='pharmacist', pincode='000000',
+                          mobile_number='0', password_hash='-')
+        products = [Product(name=f'bench-product-{i}', unit_price=1.0) for i in range(args.products)]
+        db.session.add_all([distributor, pharmacist, *products])
+        db.session.flush()
+        set_stock({(distributor.id, p.id): 10 ** 9 for p in products})
+        db.session.commit()
+        lines = [{
+            'distributor_id': distributor.id,
+            'orderer_id': pharmacist.id,
+            'product_id': products[i % len(products)].id,
+            'quantity': 1
+        } for i in range(args.orders)]
+
+    client = app.test_client()
+
+    start = time.perf_counter()
+    for line in lines:
+        assert client.post('/api/orders', json=line).status_code == 201
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, len(lines), args.batch_size):
+        assert client.post('/api/orders/batch', json={'orders': lines[i:i + args.batch_size]}).status_code == 201
+    batched = time.perf_counter() - start
+
+    print(f'per-order : {args.orders} orders in {single:.2f}s ({args.orders / single:,.0f} orders/s)')
+    print(f'batch({args.batch_size:>3}): {args.orders} orders in {batched:.2f}s ({args.orders / batched:,.0f} orders/s)')
+    print(f'speedup   : {single / batched:.1f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""Per-endpoint micro-benchmarks against a seeded database.
+
+Builds the app on an in-memory (default) or temp-file SQLite database,
+seeds it with seed.seed(), then calls every route registered on the API
+blueprint through the test client and reports throughput and p50/p99
+latency. Results are printed as a table and can be written as JSON to
+compare runs across commits:
+
+    python bench_endpoints.py --orders 100000 --output before.json
+    python bench_endpoints.py --orders 100000 --compare before.json
+"""
+import argparse
+from datetime import datetime
+import json
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from flask import current_app
+
+from app import create_app, db, Order, Inventory, StockRequest, User
+from seed import seed
+from timing import percentile
+
+
+# Long-lived streams have no per-request latency to measure
+UNBENCHMARKED = {'api.stream_distributor_requests'}
+
+
+class Context:
+    """Seeded ids plus helpers that create fresh rows for state-changing routes."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.distributor_id = ids['distributor_ids'][0]
+        self.shg_id = ids['shg_ids'][0]
+        self.pharmacist_id = ids['pharmacist_ids'][0]
+        self.product_id = db.session.execute(
+            db.select(Inventory.product_id).filter_by(owner_id=self.distributor_id)
+        ).scalars().first()
+        self.pending_request_ids = []
+        self.counter = 0
+
+        # Plenty of stock so placement and delivery never fail for lack of inventory
+        db.session.execute(
+            db.update(Inventory)
+            .where(Inventory.owner_id == self.distributor_id)
+            .values(quantity=10 ** 9)
+        )
+        db.session.commit()
+
+    def unique(self, prefix):
+        self.counter += 1
+        return f'{prefix}-{self.counter}'
+
+    def fresh_orders(self, n, status='placed'):
+        orders = [Order(distributor_id=self.distributor_id, orderer_id=self.pharmacist_id,
+                        product_id=self.product_id, quantity=1, status=status) for _ in range(n)]
+        db.session.add_all(orders)
+        db.session.commit()
+        return [o.id for o in orders]
+
+
+def build_cases(ctx, iterations):
+    """Map each API endpoint to a setup step and a request factory taking the iteration number."""
+    order_ids = {}
+    request_ids = []
+
+    def prepare_orders(name, status='placed', per_request=1):
+        def setup():
+            order_ids[name] = iter(ctx.fresh_orders(iterations * per_request, status))
+        return setup
+
+    def prepare_requests():
+        requests = [StockRequest(distributor_id=ctx.distributor_id, requester_id=ctx.shg_id, name='bench',
+                                 pincode='110001', mobile='9000000000', status='pending')
+                    for _ in range(iterations)]
+        db.session.add_all(requests)
+        db.session.commit()
+        request_ids[:] = [r.id for r in requests]
+
+    credentials = {}
+
+    def prepare_login():
+        user = User(username=ctx.unique('bench-login'), user_type='shg', pincode='110001', mobile_number='0')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        credentials['username'] = user.username
+        credentials['token'] = current_app.extensions['tokens'].issue({'id': user.id, 'user_type': user.user_type})
+
+    def bulk_csv():
+        rows = '\n'.join(f'{ctx.distributor_id},{product_id},{10 ** 9}' for product_id in ctx.ids['product_ids'][:100])
+        return 'distributor_id,product_id,quantity\n' + rows + '\n'
+
+    d, p = ctx.distributor_id, ctx.product_id
+    line = {'distributor_id': d, 'orderer_id': ctx.pharmacist_id, 'product_id': p, 'quantity': 1}
+    return {
+        'api.health_check': (None, lambda i: ('GET', '/api/health', {})),
+        'api.get_metrics': (None, lambda i: ('GET', '/api/metrics', {})),
+        'api.get_users': (None, lambda i: ('GET', '/api/users', {})),
+        'api.create_user': (None, lambda i: ('POST', '/api/users', {'json': {
+            'username': ctx.unique('bench-user'), 'password': 'secret', 'user_type': 'shg',
+            'pincode': '110001', 'mobile_number': '9000000000'}})),
+        'api.login': (prepare_login, lambda i: ('POST', '/api/login', {'json': {
+            'username': credentials['username'], 'password': 'secret'}})),
+        'api.get_me': (prepare_login, lambda i: ('GET', '/api/me', {
+            'headers': {'Authorization': f"Bearer {credentials['token']}"}})),
+        'api.get_products': (None, lambda i: ('GET', '/api/products', {})),
+        'api.get_product': (None, lambda i: ('GET', f'/api/products/{p}', {})),
+        'api.search_products': (None, lambda i: ('GET', f'/api/products/search?q=product {i % 100}', {})),
+        'api.create_product': (None, lambda i: ('POST', '/api/products', {'json': {
+            'name': ctx.unique('bench-product'), 'unit_price': 10}})),
+        'api.create_stock_request': (None, lambda i: ('POST', '/api/requests', {'json': {
+            'distributor_id': d, 'requester_id': ctx.shg_id, 'name': 'bench', 'pincode': '110001',
+            'mobile': '9000000000'}})),
+        'api.get_distributor_requests': (None, lambda i: ('GET', f'/api/distributor/{d}/requests', {})),
+        'api.respond_to_request': (prepare_requests, lambda i: (
+            'POST', f'/api/requests/{request_ids[i]}/respond', {'json': {'product_id': p, 'quantity': 1}})),
+        'api.set_distributor_inventory': (None, lambda i: ('POST', '/api/distributor/inventory', {'json': {
+            'distributor_id': d, 'product_id': p, 'quantity': 10 ** 9}})),
+        'api.bulk_set_distributor_inventory': (None, lambda i: (
+            'POST', '/api/distributor/inventory/bulk', {'data': bulk_csv(), 'content_type': 'text/csv'})),
+        'api.adjust_inventory': (None, lambda i: ('POST', '/api/inventory/adjust', {'json': {
+            'owner_id': d, 'product_id': p, 'delta': 1}})),
+        'api.get_inventory_movements': (None, lambda i: ('GET', f'/api/inventory/{d}/movements', {})),
+        'api.set_reorder_threshold': (None, lambda i: ('POST', '/api/distributor/thresholds', {'json': {
+            'distributor_id': d, 'product_id': p, 'threshold': i % 2 * 100000}})),
+        'api.get_stock_alerts': (None, lambda i: ('GET', f'/api/distributor/{d}/alerts', {})),
+        'api.get_distributor_inventory': (None, lambda i: ('GET', f'/api/distributor/{d}/inventory', {})),
+        'api.place_order': (None, lambda i: ('POST', '/api/orders', {'json': line})),
+        'api.place_orders_batch': (None, lambda i: ('POST', '/api/orders/batch', {'json': {'orders': [line] * 20}})),
+        'api.update_order_status': (prepare_orders('status'), lambda i: (
+            'PUT', f'/api/orders/{next(order_ids["status"])}/status', {'json': {'status': 'accepted', 'distributor_id': d}})),
+        'api.bulk_update_order_status': (prepare_orders('bulk', per_request=50), lambda i: (
+            'PUT', '/api/orders/status', {'json': {'status': 'accepted', 'distributor_id': d,
+                                                   'order_ids': [next(order_ids['bulk']) for _ in range(50)]}})),
+        'api.deliver_order': (prepare_orders('deliver'), lambda i: (
+            'PUT', f'/api/orders/{next(order_ids["deliver"])}/deliver', {'json': {'distributor_id': d}})),
+        'api.get_orders': (None, lambda i: ('GET', f'/api/orders?distributor_id={d}&limit=100', {})),
+        'api.get_shg_inventory': (None, lambda i: ('GET', f'/api/shg/{ctx.shg_id}/inventory', {})),
+        'api.get_pharmacist_inventory': (None, lambda i: ('GET', f'/api/pharmacist/{ctx.pharmacist_id}/inventory', {})),
+        'api.distributor_report': (None, lambda i: ('GET', '/api/reports/distributors', {})),
+        'api.product_report': (None, lambda i: ('GET', f'/api/reports/products?distributor_id={d}', {})),
+        'api.daily_report': (None, lambda i: ('GET', '/api/reports/daily', {})),
+        'api.get_reorder_suggestions': (None, lambda i: ('GET', f'/api/distributor/{d}/reorder-suggestions', {})),
+        'api.discover_distributors': (None, lambda i: (
+            'GET', f'/api/distributors?pincode={110001 + i % 60}&product_id={p}', {})),
+        'api.export_orders': (None, lambda i: ('GET', f'/api/export/orders?distributor_id={d}', {})),
+        'api.export_inventory': (None, lambda i: ('GET', f'/api/export/distributor/inventory?distributor_id={d}', {})),
+    }
+
+
+def run(args):
+    if args.db == 'file':
+        uri = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    else:
+        uri = 'sqlite://'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'SECRET_KEY': secrets.token_hex(32)})
+    client = app.test_client()
+
+    results = {}
+    with app.app_context():
+        db.create_all()
+        ids = seed(distributors=args.distributors, shgs=args.orderers, pharmacists=args.orderers,
+                   products=args.products, inventory_per_distributor=args.inventory_per_distributor,
+                   orders=args.orders, stock_requests=args.stock_requests)
+        ctx = Context(ids)
+        # Routes that consume a fresh row per request need rows for the warmup too
+        cases = build_cases(ctx, args.warmup + args.iterations)
+
+        endpoints = sorted(rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint.startswith('api.'))
+        missing = [e for e in endpoints if e not in cases and e not in UNBENCHMARKED]
+        if missing:
+            print(f"warning: no benchmark case for {', '.join(missing)}", file=sys.stderr)
+
+        selected = [e for e in endpoints if e in cases and (not args.only or any(o in e for o in args.only))]
+        for endpoint in selected:
+            setup, make_request = cases[endpoint]
+            if setup:
+                setup()
+            samples = []
+            errors = 0
+            for i in range(args.warmup + args.iterations):
+                method, path, kwargs = make_request(i)
+                start = time.perf_counter()
+                response = client.open(path, method=method, **kwargs)
+                # Drain streamed bodies inside the timing and release their contexts
+                response.get_data()
+                response.close()
+                elapsed = time.perf_counter() - start
+                if i >= args.warmup:
+                    samples.append(elapsed)
+                    errors += response.status_code >= 400
+            total = sum(samples)
+            results[endpoint] = {
+                'requests': len(samples),
+                'errors': errors,
+                'throughput_rps': round(len(samples) / total, 1),
+                'mean_ms': round(statistics.mean(samples) * 1000, 3),
+                'p50_ms': round(percentile(samples, 50) * 1000, 3),
+                'p99_ms': round(percentile(samples, 99) * 1000, 3),
+            }
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--distributors', type=int, default=20)
+    parser.add_argument('--orderers', type=int, default=100, help='SHGs and pharmacists, each')
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--inventory-per-distributor', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--stock-requests', type=int, default=5000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--db', choices=['memory', 'file'], default='memory')
+    parser.add_argument('--only', nargs='*', help='substrings of endpoint names to run')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--compare', help='JSON results from an earlier run to compare against')
+    args = parser.parse_args()
+    results = run(args)
+    baseline = json.load(open(args.compare))['results'] if args.compare else {}
+
+    print(f"{'endpoint':<36} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}" + ('  p50 vs base' if baseline else ''))
+    for endpoint, r in results.items():
+        row = f"{endpoint:<36} {r['throughput_rps']:>9} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['errors']:>7}"
+        if endpoint in baseline:
+            change = (r['p50_ms'] - baseline[endpoint]['p50_ms']) / baseline[endpoint]['p50_ms'] * 100
+            row += f'  {change:+10.1f}%'
+        print(row)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'revision': git_revision(),
+                'timestamp': datetime.utcnow().isoformat(),
+                'dataset': {k: getattr(args, k) for k in ['distributors', 'orderers', 'products',
+                                                          'inventory_per_distributor', 'orders', 'stock_requests']},
+                'db': args.db,
+                'results': results,
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Check that the export endpoints stream in constant memory as the table grows.
+
+Seeds increasing numbers of orders, streams GET /api/export/orders without
+buffering the body, and reports throughput and peak Python heap usage.
+
+    python bench_export.py [--sizes 10000 50000 200000] [--format csv]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app import create_app, db
+from seed import seed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 200000])
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    args = parser.parse_args()
+
+    print(f'{"orders":>8} {"seconds":>8} {"rows/s":>10} {"MB out":>8} {"peak heap MB":>13}')
+    for size in args.sizes:
+        db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+        with app.app_context():
+            db.create_all()
+            seed(orders=size, stock_requests=0)
+
+        client = app.test_client()
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = client.get(f'/api/export/orders?format={args.format}', buffered=False)
+        assert response.status_code == 200
+        total = lines = 0
+        for chunk in response.response:
+            total += len(chunk)
+            lines += chunk.count(b'\n')
+        response.close()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        rows = lines - (1 if args.format == 'csv' else 0)
+        assert rows == size, (rows, size)
+        print(f'{size:>8} {elapsed:>8.2f} {rows / elapsed:>10,.0f} {total / 1e6:>8.1f} {peak / 1e6:>13.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Benchmark reorder suggestions over a million orders' worth of history.
+
+Synthesizes orders across distributors, products and days, stores them as the
+daily rollups the forecast reads, then times forecast_reorders() for every
+distributor and for one, and the array maths alone against a per-pair Python
+loop doing the same computation.
+
+    python bench_forecast.py [--orders 1000000] [--distributors 20] [--products 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app import create_app, db, forecast_reorders, Inventory, OrderDailyRollup, Product, User
+from forecasting import demand_matrix, load_numpy, reorder_suggestions
+from timing import timed
+
+
+def python_suggestions(history, on_hand, window, alpha, lead_time_days, cover_days, service_z):
+    # The same policy as forecasting.reorder_suggestions, one pair at a time
+    suggestions = []
+    for key, series in history.items():
+        recent = series[-window:]
+        average = sum(recent) / len(recent)
+        level = series[0]
+        for value in series[1:]:
+            level = alpha * value + (1 - alpha) * level
+        forecast = max(average, level)
+        spread = (sum((v - average) ** 2 for v in recent) / len(recent)) ** 0.5
+        safety = service_z * spread * lead_time_days ** 0.5
+        stock = on_hand.get(key, 0)
+        if forecast > 0 and stock <= forecast * lead_time_days + safety:
+            suggestions.append((key, forecast * (lead_time_days + cover_days) + safety - stock))
+    return suggestions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--distributors', type=int, default=20)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--products-per-distributor', type=int, default=300)
+    parser.add_argument('--iterations', type=int, default=3)
+    args = parser.parse_args()
+    np = load_numpy()
+    if np is None:
+        print('numpy is not installed')
+        return 1
+
+    rng = np.random.default_rng(42)
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    config = app.config
+    history_days = config['FORECAST_HISTORY_DAYS']
+    today = date.today()
+    start = today - timedelta(days=history_days)
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(User), [{
+            'username': f'distributor-{i}', 'password_hash': '-', 'user_type': 'distributor',
+            'pincode': '110001', 'mobile_number': '0'
+        } for i in range(args.distributors)])
+        db.session.execute(db.insert(Product), [
+            {'name': f'Product {i}', 'unit_price': 1.0} for i in range(args.products)
+        ])
+        distributor_ids = np.arange(1, args.distributors + 1)
+        catalogs = np.stack([
+            rng.choice(np.arange(1, args.products + 1), args.products_per_distributor, replace=False)
+            for _ in distributor_ids
+        ])
+
+        # Synthetic orders, skewed towards popular products, aggregated to daily rollups
+        started = time.perf_counter()
+        order_distributors = rng.integers(0, args.distributors, args.orders)
+        order_products = catalogs[order_distributors, rng.zipf(1.3, args.orders) % args.products_per_distributor]
+        order_days = rng.integers(0, history_days, args.orders)
+        order_units = rng.integers(1, 20, args.orders)
+        keys, index = np.unique(
+            np.stack([order_days, distributor_ids[order_distributors], order_products], axis=1),
+            axis=0, return_inverse=True
+        )
+        orders_placed = np.bincount(index.ravel())
+        units_placed = np.bincount(index.ravel(), weights=order_units).astype(np.int64)
+        rows = [{
+            'day': start + timedelta(days=day), 'distributor_id': distributor, 'product_id': product,
+            'orders_placed': placed, 'units_placed': units, 'orders_delivered': 0, 'units_delivered': 0,
+            'revenue': 0.0, 'delivery_seconds': 0.0
+        } for (day, distributor, product), placed, units in zip(keys.tolist(), orders_placed.tolist(), units_placed.tolist())]
+        db.session.execute(db.insert(OrderDailyRollup), rows)
+        db.session.execute(db.insert(Inventory), [{
+            'owner_id': distributor, 'product_id': product, 'quantity': int(rng.integers(0, 500))
+        } for distributor, catalog in zip(distributor_ids.tolist(), catalogs.tolist()) for product in catalog])
+        db.session.commit()
+        print(f'{args.orders:,} orders -> {len(rows):,} rollup rows in {time.perf_counter() - started:.1f}s')
+
+        every, suggestions = timed(lambda: forecast_reorders(today=today), args.iterations)
+        one, mine = timed(lambda: forecast_reorders(1, today=today), args.iterations)
+        print(f'forecast_reorders() all distributors  {every * 1000:>9.1f} ms  {len(suggestions):,} suggestions')
+        print(f'forecast_reorders(1) one distributor  {one * 1000:>9.1f} ms  {len(mine):,} suggestions')
+
+        # Array maths alone versus a per-pair loop, on the same history
+        history_rows = db.session.execute(db.select(
+            OrderDailyRollup.distributor_id, OrderDailyRollup.product_id, OrderDailyRollup.day, OrderDailyRollup.units_placed
+        )).all()
+        stock = dict(((owner, product), quantity) for owner, product, quantity in db.session.execute(
+            db.select(Inventory.owner_id, Inventory.product_id, Inventory.quantity)).all())
+    distributors, products, days, units = zip(*history_rows)
+    offsets = np.fromiter(map(date.toordinal, days), np.int64, len(days)) - start.toordinal()
+    policy = dict(window=config['FORECAST_WINDOW_DAYS'], alpha=config['FORECAST_SMOOTHING'],
+                  lead_time_days=config['REORDER_LEAD_TIME_DAYS'], cover_days=config['REORDER_COVER_DAYS'],
+                  service_z=config['REORDER_SERVICE_Z'])
+
+    def vectorized():
+        keys, demand = demand_matrix(distributors, products, offsets, units, history_days)
+        on_hand = np.array([stock.get((int(k >> 32), int(k & 0xFFFFFFFF)), 0) for k in keys], dtype=np.float64)
+        return reorder_suggestions(keys, demand, on_hand, **policy)
+
+    def looped():
+        history = {}
+        for distributor, product, offset, quantity in zip(distributors, products, offsets.tolist(), units):
+            history.setdefault((distributor, product), [0] * history_days)[offset] += quantity
+        return python_suggestions(history, stock, **policy)
+
+    vector_time, result = timed(vectorized, args.iterations)
+    loop_time, expected = timed(looped, 1)
+    assert len(result['product_id']) == len(expected), (len(result['product_id']), len(expected))
+    print(f'numpy maths                           {vector_time * 1000:>9.1f} ms')
+    print(f'per-pair python loop                  {loop_time * 1000:>9.1f} ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Benchmark GET /api/products/search (FTS5) against a LIKE '%q%' scan.
+
+Builds a catalog of generated medicine names and descriptions, then times
+each query through the endpoint (ranked, first page) against LIKE over name
+and description: the unranked first page, which can stop early on common
+terms, and the full scan any ranking or count over LIKE needs.
+
+    python bench_search.py [--products 100000] [--iterations 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from app import create_app, db, Product
+from timing import timed
+
+DRUGS = ['paracetamol', 'ibuprofen', 'amoxicillin', 'cetirizine', 'metformin', 'azithromycin',
+         'omeprazole', 'atorvastatin', 'amlodipine', 'losartan', 'salbutamol', 'ondansetron',
+         'diclofenac', 'ranitidine', 'levocetirizine', 'pantoprazole', 'montelukast', 'doxycycline']
+FORMS = ['tablets', 'capsules', 'syrup', 'suspension', 'gel', 'drops', 'injection', 'cream']
+STRENGTHS = ['5mg', '10mg', '50mg', '100mg', '250mg', '500mg', '650mg']
+WORDS = ['for', 'fever', 'pain', 'relief', 'infection', 'allergy', 'acidity', 'cough', 'cold',
+         'blood', 'pressure', 'diabetes', 'adult', 'children', 'dose', 'after', 'meals', 'strip',
+         'pack', 'of', 'ten', 'store', 'below', 'room', 'temperature', 'prescription', 'only']
+QUERIES = ['paracetamol', 'amoxicillin 500mg', 'fever', 'pressure tablets', 'ondans', 'nosuchdrug']
+
+
+def catalog(n, rng):
+    for i in range(n):
+        drug = rng.choice(DRUGS)
+        yield {
+            'name': f'{drug.title()} {rng.choice(STRENGTHS)} {rng.choice(FORMS)} #{i}',
+            'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 30))),
+            'unit_price': round(rng.uniform(1, 500), 2),
+        }
+
+
+def like_search(q, limit):
+    pattern = f'%{q}%'
+    return db.session.execute(
+        db.select(Product.id, Product.name, Product.description, Product.unit_price)
+        .where(db.or_(Product.name.ilike(pattern), Product.description.ilike(pattern)))
+        .order_by(Product.id).limit(limit)
+    ).all()
+
+
+def like_count(q):
+    pattern = f'%{q}%'
+    return db.session.execute(
+        db.select(db.func.count()).select_from(Product)
+        .where(db.or_(Product.name.ilike(pattern), Product.description.ilike(pattern)))
+    ).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        db.session.execute(db.insert(Product), list(catalog(args.products, random.Random(42))))
+        db.session.commit()
+        print(f'inserted and indexed {args.products:,} products in {time.perf_counter() - start:.1f}s')
+
+        def via_search(q):
+            def run():
+                response = client.get('/api/products/search', query_string={'q': q, 'limit': args.limit})
+                assert response.status_code == 200
+                return len(response.json)
+            return run
+
+        print(f'{"query":<20} {"matches":>8} {"fts ms":>9} {"like page ms":>13} {"like scan ms":>13}')
+        for q in QUERIES:
+            fts, found = timed(via_search(q), args.iterations)
+            like, _ = timed(lambda: like_search(q, args.limit), args.iterations)
+            count_time, matches = timed(lambda: like_count(q), args.iterations)
+            print(f'{q:<20} {matches:>8,} {fts * 1000:>9.2f} {like * 1000:>13.2f} {count_time * 1000:>13.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Benchmark list serialization for GET /api/orders and GET /api/users on 10k rows.
+
+Compares the previous ORM-instance path (joinedload + per-object dicts) with the
+column-projected path, under the stdlib and orjson JSON providers, and with a
+sparse ``?fields=`` selection.
+
+    python bench_serialization.py [--orders 10000] [--users 10000] [--iterations 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import joinedload
+
+from app import create_app, db, Order, User
+from seed import seed
+from serialization import OrjsonProvider, orjson
+from timing import timed
+
+
+def legacy_orders():
+    orders = Order.query.options(
+        joinedload(Order.distributor), joinedload(Order.orderer), joinedload(Order.product)
+    ).order_by(Order.created_at.desc(), Order.id.desc()).all()
+    return [{
+        'id': o.id,
+        'distributor_id': o.distributor_id,
+        'distributor_name': o.distributor.username,
+        'orderer_id': o.orderer_id,
+        'orderer_name': o.orderer.username,
+        'orderer_type': o.orderer.user_type,
+        'product_id': o.product_id,
+        'product_name': o.product.name,
+        'quantity': o.quantity,
+        'status': o.status,
+        'created_at': o.created_at.isoformat(),
+        'delivered_at': o.delivered_at.isoformat() if o.delivered_at else None
+    } for o in orders]
+
+
+def legacy_users():
+    return [{'id': u.id, 'username': u.username, 'user_type': u.user_type} for u in User.query.all()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    with app.app_context():
+        db.create_all()
+        seed(pharmacists=args.users, orders=args.orders, stock_requests=0)
+
+    client = app.test_client()
+    providers = [('stdlib', DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonProvider(app)))
+    else:
+        print('orjson not installed; skipping orjson runs')
+
+    def via_client(path):
+        def run():
+            response = client.get(path)
+            assert response.status_code == 200
+            return len(response.data)
+        return run
+
+    def via_legacy(build):
+        def run():
+            with app.test_request_context():
+                return len(app.json.response(build()).get_data())
+        return run
+
+    cases = [
+        ('orders  legacy ORM', via_legacy(legacy_orders)),
+        ('orders  projected', via_client('/api/orders')),
+        ('orders  ?fields=id,status,quantity', via_client('/api/orders?fields=id,status,quantity')),
+        ('users   legacy ORM', via_legacy(legacy_users)),
+        ('users   projected', via_client('/api/users')),
+        ('users   ?fields=id,username', via_client('/api/users?fields=id,username')),
+    ]
+
+    print(f'{"case":<38} {"json":<7} {"best ms":>9} {"bytes":>10}')
+    for name, provider in providers:
+        app.json = provider
+        for label, run in cases:
+            best, size = timed(run, args.iterations)
+            print(f'{label:<38} {name:<7} {best * 1000:>9.1f} {size:>10,}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
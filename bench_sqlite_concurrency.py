@@ -0,0 +1,116 @@
+"""Mixed read/write concurrency benchmark for the SQLite engine settings.
+
+Runs the same workload twice in fresh processes, once with SQLite's stock
+settings (rollback journal, synchronous=FULL, small page cache, no mmap) and
+once with the defaults from config.Config (WAL, synchronous=NORMAL, mmap,
+larger cache), and reports throughput and failed requests for each.
+
+    python bench_sqlite_concurrency.py [--threads 16] [--seconds 5] [--write-ratio 0.2]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from app import create_app, db, User, Product, set_stock
+
+CONFIGURATIONS = {
+    'sqlite-defaults': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_BUSY_TIMEOUT': '5000',
+        'SQLITE_MMAP_SIZE': '0',
+        'SQLITE_CACHE_SIZE': '-2000',
+    },
+    'tuned': {},
+}
+
+
+def run_workload(args):
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+
+    with app.app_context():
+        db.create_all()
+        distributor = User(username='bench-distributor', user_type='distributor', pincode='000000',
+                           mobile_number='0', password_hash='-')
+        pharmacist = User(username='bench-pharmacist', user_type='pharmacist', pincode='000000',
+                          mobile_number='0', password_hash='-')
+        products = [Product(name=f'bench-product-{i}', unit_price=1.0) for i in range(10)]
+        db.session.add_all([distributor, pharmacist, *products])
+        db.session.flush()
+        set_stock({(distributor.id, p.id): 10 ** 9 for p in products})
+        db.session.commit()
+        distributor_id, pharmacist_id = distributor.id, pharmacist.id
+        product_ids = [p.id for p in products]
+
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        local = {'reads': 0, 'writes': 0, 'errors': 0}
+        while time.perf_counter() < deadline:
+            if rng.random() < args.write_ratio:
+                response = client.post('/api/orders', json={
+                    'distributor_id': distributor_id,
+                    'orderer_id': pharmacist_id,
+                    'product_id': rng.choice(product_ids),
+                    'quantity': 1
+                })
+                kind = 'writes'
+            elif rng.random() < 0.5:
+                response = client.get(f'/api/orders?distributor_id={distributor_id}&limit=50')
+                kind = 'reads'
+            else:
+                response = client.get(f'/api/distributor/{distributor_id}/inventory')
+                kind = 'reads'
+            local['errors' if response.status_code >= 500 else kind] += 1
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    counts['requests_per_second'] = round((counts['reads'] + counts['writes']) / args.seconds, 1)
+    print(json.dumps(counts))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--run', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_workload(args)
+        return 0
+
+    for name, overrides in CONFIGURATIONS.items():
+        env = dict(os.environ, **overrides)
+        output = subprocess.run(
+            [sys.executable, __file__, '--run', '--threads', str(args.threads),
+             '--seconds', str(args.seconds), '--write-ratio', str(args.write_ratio)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        print(f"{name:<16} {result['requests_per_second']:>8} req/s  "
+              f"reads={result['reads']} writes={result['writes']} errors={result['errors']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Measure worker startup cost.
+
+Each scenario runs in a fresh interpreter against a new SQLite file:
+
+* ``import``       - ``import app`` only (what test collection and CLI tools pay)
+* ``create_app``   - import plus building the app (what a worker pays on boot)
+* ``create_all``   - import, create_app() and db.create_all(), i.e. what every
+                     import of app.py used to do before the application factory
+
+For each it reports import time, time spent after import, database connections opened and whether the
+database file was touched.
+
+    python bench_startup.py [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SCENARIO = r'''
+import json, os, sys, time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+connections = []
+event.listen(Engine, 'connect', lambda *args: connections.append(1))
+
+scenario, db_path = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+if scenario != 'import':
+    flask_app = app.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    if scenario == 'create_all':
+        with flask_app.app_context():
+            app.db.create_all()
+done = time.perf_counter()
+print(json.dumps({'import': imported - start, 'setup': done - imported, 'connections': len(connections), 'db_file': os.path.exists(db_path)}))
+'''
+
+
+def run(scenario):
+    db_path = os.path.join(tempfile.mkdtemp(), 'startup.db')
+    output = subprocess.run(
+        [sys.executable, '-c', SCENARIO, scenario, db_path],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1]
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for scenario in ['import', 'create_app', 'create_all']:
+        results = [run(scenario) for _ in range(args.repeat)]
+        import_ms = statistics.median(r['import'] for r in results) * 1000
+        setup_ms = statistics.median(r['setup'] for r in results) * 1000
+        print(f"{scenario:<11} import {import_ms:7.1f} ms  setup {setup_ms:6.1f} ms  connections={results[-1]['connections']}  "
+              f"db_file_created={results[-1]['db_file']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import bisect
+import hashlib
+from collections import OrderedDict
+import threading
+import time
+
+
+class ResponseCache:
+    """Pre-serialized JSON bodies with strong ETags, dropped wholesale on invalidate().
+
+    Entries built from data read before an invalidation are never stored, and
+    every entry also expires after ``ttl`` seconds so that other worker
+    processes, which do not see this process's invalidations, converge.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = 0
+
+    def get(self, key, build):
+        """Return ``(body, etag)`` for ``key``, calling ``build()`` for the bytes on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            version = self._version
+        if entry and now - entry[2] < self.ttl:
+            return entry[0], entry[1]
+
+        body = build()
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        with self._lock:
+            if self._version == version:
+                self._entries[key] = (body, etag, now)
+        return body, etag
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+
+class LRUCache:
+    """Bounded least-recently-used mapping whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[1] >= self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class PincodeDirectory:
+    """Entries grouped by pincode, rebuilt from ``load()`` after invalidate() or every ``ttl`` seconds.
+
+    ``load`` returns ``(pincode, entry)`` pairs. Lookups walk outwards from a
+    pincode through ever shorter prefixes, using a sorted pincode list so each
+    prefix is a bisect range rather than a scan.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = 0
+
+    def _current(self, load):
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._snapshot
+            version = self._version
+        if snapshot and now - snapshot[2] < self.ttl:
+            return snapshot
+
+        by_pincode = {}
+        for pincode, entry in load():
+            by_pincode.setdefault(pincode, []).append(entry)
+        snapshot = (sorted(by_pincode), by_pincode, now)
+        with self._lock:
+            if self._version == version:
+                self._snapshot = snapshot
+        return snapshot
+
+    def search(self, pincode, load, min_prefix=3):
+        """Return ``[(prefix, entries)]`` for the pincode, then its prefixes down to ``min_prefix`` digits.
+
+        The first level is an equality match on the full pincode. Each later
+        level lists only entries not already found at a closer level,
+        numerically nearest pincodes first.
+        """
+        pincodes, by_pincode, _ = self._current(load)
+        levels = [(pincode, list(by_pincode.get(pincode, ())))]
+        seen = {pincode}
+        for length in range(len(pincode) - 1, min_prefix - 1, -1):
+            prefix = pincode[:length]
+            start = bisect.bisect_left(pincodes, prefix)
+            end = bisect.bisect_left(pincodes, prefix + '\uffff', start)
+            found = [p for p in pincodes[start:end] if p not in seen]
+            seen.update(found)
+            found.sort(key=lambda p: (_pincode_distance(p, pincode), p))
+            levels.append((prefix, [entry for p in found for entry in by_pincode[p]]))
+        return levels
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+
+def _pincode_distance(a, b):
+    try:
+        return abs(int(a) - int(b))
+    except ValueError:
+        return 0
@@ -0,0 +1,120 @@
+"""Catch N+1 regressions in the list endpoints.
+
+Seeds a small and a large dataset, requests every list endpoint against
+both with cold caches, and fails if an endpoint issues more SQL statements
+for the larger dataset or exceeds the budget declared with @query_budget.
+tests/test_query_budgets.py runs the same check under pytest, with
+QUERY_BUDGET_STRICT set so an overrun raises QueryBudgetExceeded on the
+request itself.
+
+    python check_query_budgets.py
+"""
+import sys
+
+from app import create_app, db, Inventory
+from metrics import count_queries
+from seed import seed
+
+SCALES = {
+    'small': dict(distributors=2, shgs=2, pharmacists=2, products=5, inventory_per_distributor=3,
+                  orders=10, stock_requests=10),
+    'large': dict(distributors=2, shgs=20, pharmacists=20, products=300, inventory_per_distributor=200,
+                  orders=2000, stock_requests=1000),
+}
+
+
+# (name, path) for every list endpoint; paths are filled in from the seeded ids
+LIST_ENDPOINTS = [
+    ('get_distributor_requests', '/api/distributor/{distributor_id}/requests'),
+    ('get_users', '/api/users'),
+    ('get_users?type', '/api/users?type=distributor'),
+    ('get_products', '/api/products'),
+    ('get_distributor_inventory', '/api/distributor/{distributor_id}/inventory'),
+    ('get_orders', '/api/orders'),
+    ('get_orders?distributor_id', '/api/orders?distributor_id={distributor_id}'),
+    ('get_orders?orderer_id', '/api/orders?orderer_id={shg_id}'),
+    ('get_orders?status&limit', '/api/orders?status=placed&limit=50'),
+    ('get_shg_inventory', '/api/shg/{shg_id}/inventory'),
+    ('get_pharmacist_inventory', '/api/pharmacist/{pharmacist_id}/inventory'),
+    ('distributor_report', '/api/reports/distributors'),
+    ('product_report', '/api/reports/products?distributor_id={distributor_id}'),
+    ('daily_report', '/api/reports/daily'),
+    ('search_products', '/api/products/search?q=product'),
+    ('discover_distributors', '/api/distributors?pincode=110001'),
+    ('get_reorder_suggestions', '/api/distributor/{distributor_id}/reorder-suggestions'),
+    ('get_stock_alerts', '/api/distributor/{distributor_id}/alerts'),
+    ('discover_distributors?product_id', '/api/distributors?pincode=110009&product_id={product_id}'),
+]
+
+
+def list_endpoints(ids):
+    first = {
+        'distributor_id': ids['distributor_ids'][0],
+        'shg_id': ids['shg_ids'][0],
+        'pharmacist_id': ids['pharmacist_ids'][0],
+        'product_id': ids['product_ids'][0],
+    }
+    return [(name, path.format(**first)) for name, path in LIST_ENDPOINTS]
+
+
+def seeded_app(scale, **config):
+    """An in-memory app seeded with the ``scale`` dataset; returns ``(app, ids)``."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'TESTING': True, **config})
+    with app.app_context():
+        db.create_all()
+        ids = seed(**SCALES[scale])
+        # Give every orderer some stock so the SHG/pharmacist lists are not empty
+        for owner_id in [ids['shg_ids'][0], ids['pharmacist_ids'][0]]:
+            db.session.execute(db.insert(Inventory), [
+                {'owner_id': owner_id, 'product_id': product_id, 'quantity': 1}
+                for product_id in ids['product_ids']
+            ])
+        db.session.commit()
+    return app, ids
+
+
+def cold_get(app, path):
+    """GET ``path`` with empty caches; returns the response and the SQL statements it issued."""
+    app.extensions['user_cache'].clear()
+    app.extensions['product_cache'].invalidate()
+    app.extensions['distributor_directory'].invalidate()
+    with app.app_context(), count_queries(db.engine) as statements:
+        response = app.test_client().get(path)
+    return response, statements
+
+
+def declared_budget(app, name):
+    return getattr(app.view_functions['api.' + name.split('?')[0]], 'query_budget', None)
+
+
+def measure(scale):
+    app, ids = seeded_app(scale)
+    results = {}
+    for name, path in list_endpoints(ids):
+        response, statements = cold_get(app, path)
+        assert response.status_code == 200, (path, response.status_code)
+        results[name] = (len(statements), len(response.json), declared_budget(app, name))
+    return results
+
+
+def main():
+    small = measure('small')
+    large = measure('large')
+
+    failures = 0
+    print(f"{'endpoint':<45} {'rows':>11} {'queries':>9} {'budget':>7}")
+    for key in small:
+        (small_queries, small_rows, budget), (large_queries, large_rows, _) = small[key], large[key]
+        ok = small_queries == large_queries and (budget is None or large_queries <= budget)
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {key:<40} {small_rows:>5}/{large_rows:<5} "
+              f"{small_queries:>4}/{large_queries:<4} {budget if budget is not None else '-':>6}")
+
+    if failures:
+        print(f'\n{failures} endpoint(s) over budget or scaling query count with result size')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import os
+
+
+def _env_int(name, default=None):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def engine_options():
+    """SQLAlchemy engine options taken from the environment.
+
+    Pool sizing guidance:
+
+    * Threaded server (e.g. ``gunicorn --threads 8``): one process shares a
+      single pool, so set ``DB_POOL_SIZE`` to the thread count and keep
+      ``DB_MAX_OVERFLOW`` small; a request never holds more than one
+      connection.
+    * Multi-process server (e.g. ``gunicorn -w 4``): every worker builds its
+      own pool after fork, so the database sees ``workers * (DB_POOL_SIZE +
+      DB_MAX_OVERFLOW)`` connections. Size per worker, not per server.
+    * SQLite allows one writer at a time whatever the pool size. With WAL
+      readers no longer wait for that writer, and ``SQLITE_BUSY_TIMEOUT``
+      makes writers queue instead of failing with ``database is locked``.
+
+    Pool size options are only passed when set, because in-memory SQLite
+    uses a pool class that does not accept them.
+    """
+    options = {'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '0') == '1'}
+    for option, name in [('pool_size', 'DB_POOL_SIZE'),
+                         ('max_overflow', 'DB_MAX_OVERFLOW'),
+                         ('pool_timeout', 'DB_POOL_TIMEOUT'),
+                         ('pool_recycle', 'DB_POOL_RECYCLE')]:
+        value = _env_int(name)
+        if value is not None:
+            options[option] = value
+    return options
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///inventory.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options()
+    # Signs login tokens; without it /api/login is disabled. Generate one with
+    # python -c "import secrets; print(secrets.token_hex(32))"
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+
+    # Applied to every new SQLite connection
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT', 5000),
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        'cache_size': _env_int('SQLITE_CACHE_SIZE', -64000),
+    }
+
+    # Use orjson for responses when it is installed
+    JSON_FAST = os.environ.get('JSON_FAST', '1') == '1'
+
+    PRODUCT_CACHE_TTL = _env_int('PRODUCT_CACHE_TTL', 60)
+    USER_CACHE_SIZE = _env_int('USER_CACHE_SIZE', 10000)
+    USER_CACHE_TTL = _env_int('USER_CACHE_TTL', 300)
+
+    # Distributor discovery falls back from the exact pincode to prefixes no shorter than
+    # this (3 digits = the sorting district); the pincode map is also rebuilt on user changes
+    DISCOVERY_MIN_PREFIX = _env_int('DISCOVERY_MIN_PREFIX', 3)
+    DISCOVERY_DIRECTORY_TTL = _env_int('DISCOVERY_DIRECTORY_TTL', 300)
+
+    # Demand forecasting (needs numpy): days of rollup history, moving-average window,
+    # smoothing factor, and the reorder policy (lead time, days of cover after it, and the
+    # z-score for safety stock; 1.65 covers ~95% of lead-time demand)
+    FORECAST_HISTORY_DAYS = _env_int('FORECAST_HISTORY_DAYS', 56)
+    FORECAST_WINDOW_DAYS = _env_int('FORECAST_WINDOW_DAYS', 14)
+    FORECAST_SMOOTHING = float(os.environ.get('FORECAST_SMOOTHING', 0.3))
+    REORDER_LEAD_TIME_DAYS = _env_int('REORDER_LEAD_TIME_DAYS', 3)
+    REORDER_COVER_DAYS = _env_int('REORDER_COVER_DAYS', 7)
+    REORDER_SERVICE_Z = float(os.environ.get('REORDER_SERVICE_Z', 1.65))
+
+    # Server-Sent Events streams send a keepalive and re-check the database this often.
+    # Each open stream holds a server thread, so run streams on a threaded or async worker.
+    SSE_KEEPALIVE_SECONDS = _env_int('SSE_KEEPALIVE_SECONDS', 15)
+
+    # Password hashing runs in this many worker processes (0 hashes inline)
+    PASSWORD_HASH_WORKERS = _env_int('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1))
+    PASSWORD_HASH_TIMEOUT = _env_int('PASSWORD_HASH_TIMEOUT', 10)
+    # Lifetime of login tokens, and whether routes that act for a user insist on one
+    AUTH_TOKEN_MAX_AGE = _env_int('AUTH_TOKEN_MAX_AGE', 24 * 3600)
+    AUTH_REQUIRED = os.environ.get('AUTH_REQUIRED', '0') == '1'
+
+    # Append every request to this NDJSON file for replay with traffic.py
+    TRAFFIC_RECORD_PATH = os.environ.get('TRAFFIC_RECORD_PATH')
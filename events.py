@@ -0,0 +1,51 @@
+from collections import defaultdict
+import json
+import queue
+import threading
+
+
+class EventBroker:
+    """In-process publish/subscribe for pushing events to streaming clients.
+
+    Only reaches subscribers in the same process; streams that must see
+    writes made by other workers catch up from the database as well.
+    A subscriber that falls ``max_queue`` events behind loses the overflow.
+    """
+
+    def __init__(self, max_queue=1000):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, channel):
+        subscription = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, channel, subscription):
+        with self._lock:
+            self._subscribers[channel].discard(subscription)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+    def publish(self, channel, event_type, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait((event_type, data))
+            except queue.Full:
+                pass
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+def format_sse(event_type, data, event_id=None):
+    lines = [f'event: {event_type}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
@@ -0,0 +1,128 @@
+"""Check that the hot routes in app.py are served by indexes.
+
+Seeds a small in-memory SQLite database, calls each route through the test
+client while recording the SQL it actually runs, then runs EXPLAIN QUERY PLAN
+on every recorded statement (with its real parameters). A route fails if any
+of its statements falls back to a full table scan or a temporary B-tree for
+ORDER BY.
+
+    python explain_indexes.py
+"""
+from datetime import datetime, timedelta
+import sys
+
+from sqlalchemy import event
+
+from app import create_app, db, Inventory
+from seed import seed
+
+
+def routes(ids):
+    d = ids['distributor_ids'][0]
+    pharmacist = ids['pharmacist_ids'][0]
+    p, p2 = ids['product_ids'][:2]
+    since = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    line = {'distributor_id': d, 'orderer_id': pharmacist, 'product_id': p, 'quantity': 1}
+    return [
+        # Writes first, so the reads below find rows
+        ('set_distributor_inventory', 'POST', '/api/distributor/inventory',
+         {'json': {'distributor_id': d, 'product_id': p, 'quantity': 1000}}),
+        ('bulk_set_distributor_inventory', 'POST', '/api/distributor/inventory/bulk',
+         {'data': f'distributor_id,product_id,quantity\n{d},{p},1000\n{d},{p2},1000\n', 'content_type': 'text/csv'}),
+        ('adjust_inventory', 'POST', '/api/inventory/adjust',
+         {'json': {'owner_id': d, 'product_id': p, 'delta': 5}}),
+        ('set_reorder_threshold', 'POST', '/api/distributor/thresholds',
+         {'json': {'distributor_id': d, 'product_id': p, 'threshold': 10}}),
+        ('place_order', 'POST', '/api/orders', {'json': line}),
+        ('place_orders_batch', 'POST', '/api/orders/batch', {'json': {'orders': [line, dict(line, product_id=p2)]}}),
+        ('update_order_status', 'PUT', lambda: f'/api/orders/{ids["order_id"]}/status',
+         {'json': {'status': 'accepted', 'distributor_id': d}}),
+        ('deliver_order', 'PUT', lambda: f'/api/orders/{ids["order_id"]}/deliver',
+         {'json': {'distributor_id': d}}),
+        ('get_distributor_inventory', 'GET', f'/api/distributor/{d}/inventory', {}),
+        ('get_distributor_inventory?changed_since=', 'GET',
+         f'/api/distributor/{d}/inventory?changed_since={since}', {}),
+        ('get_pharmacist_inventory', 'GET', f'/api/pharmacist/{pharmacist}/inventory', {}),
+        ('get_inventory_movements', 'GET', f'/api/inventory/{d}/movements', {}),
+        ('get_inventory_movements?product_id=&after=', 'GET',
+         f'/api/inventory/{d}/movements?product_id={p}&after=1000000', {}),
+        ('get_distributor_requests', 'GET', f'/api/distributor/{d}/requests', {}),
+        ('get_orders', 'GET', '/api/orders?limit=100', {}),
+        ('get_orders?distributor_id=', 'GET', f'/api/orders?distributor_id={d}&limit=100', {}),
+        ('get_orders?orderer_id=', 'GET', f'/api/orders?orderer_id={pharmacist}&limit=100', {}),
+        ('get_orders?status=', 'GET', '/api/orders?status=placed&limit=100', {}),
+        ('daily_report?distributor_id=&from=', 'GET',
+         f'/api/reports/daily?distributor_id={d}&from={since[:10]}', {}),
+        ('discover_distributors', 'GET', f'/api/distributors?pincode=110001&product_id={p}', {}),
+        ('get_reorder_suggestions', 'GET', f'/api/distributor/{d}/reorder-suggestions', {}),
+        ('get_stock_alerts', 'GET', f'/api/distributor/{d}/alerts', {}),
+    ]
+
+
+def bad_plan_steps(plan):
+    bad = []
+    for detail in plan:
+        if detail.startswith('SCAN') and 'USING' not in detail and 'CONSTANT ROW' not in detail:
+            bad.append(detail)
+        elif 'TEMP B-TREE' in detail:
+            bad.append(detail)
+    return bad
+
+
+def main():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'TESTING': True, 'PASSWORD_HASH_WORKERS': 0})
+    client = app.test_client()
+    failures = 0
+    with app.app_context():
+        db.create_all()
+        ids = seed(distributors=2, shgs=2, pharmacists=2, products=20, inventory_per_distributor=10,
+                   orders=50, stock_requests=20)
+        # Products the first distributor stocks
+        ids['product_ids'] = db.session.execute(
+            db.select(Inventory.product_id).filter_by(owner_id=ids['distributor_ids'][0])
+        ).scalars().all()
+
+        recorded = []
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().split(None, 1)[0].upper() in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'):
+                # executemany passes a list of parameter sets; planning one is enough
+                if parameters and isinstance(parameters, list) and isinstance(parameters[0], (tuple, list, dict)):
+                    parameters = parameters[0]
+                recorded.append((statement, tuple(parameters) if isinstance(parameters, list) else parameters))
+
+        for name, method, path, kwargs in routes(ids):
+            app.extensions['user_cache'].clear()
+            del recorded[:]
+            response = client.open(path() if callable(path) else path, method=method, **kwargs)
+            assert response.status_code < 300, (name, response.status_code, response.get_data(as_text=True))
+            if name == 'place_order':
+                ids['order_id'] = response.json['id']
+            statements = list(recorded)
+
+            plans = []
+            cursor = db.session.connection().connection.cursor()
+            for statement, parameters in statements:
+                plan = [row[-1] for row in cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)]
+                plans.append((statement, plan, bad_plan_steps(plan)))
+            cursor.close()
+            db.session.rollback()
+
+            bad = any(steps for _, _, steps in plans)
+            failures += bad
+            print(f"{'FAIL' if bad else 'ok  '} {name} ({len(plans)} statements)")
+            for statement, plan, steps in plans:
+                if steps:
+                    print(f'       {" ".join(statement.split())[:160]}')
+                    for detail in plan:
+                        print(f'         {detail}')
+
+    if failures:
+        print(f'\n{failures} route(s) not covered by an index')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Demand forecasts and reorder suggestions for every (distributor, product) pair at once.
+
+Daily demand is laid out as a pairs x days matrix, so the moving average,
+exponential smoothing and variability of all pairs come out of a handful of
+array operations instead of a Python loop per pair.
+
+numpy is optional and costs tens of milliseconds to import, so it is only
+loaded by load_numpy(), which callers run before using anything below.
+"""
+np = None
+_numpy_missing = False
+
+
+def load_numpy():
+    """Import numpy on first use and return it, or None when it is not installed."""
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - optional dependency
+            _numpy_missing = True
+        else:
+            np = numpy
+    return np
+
+
+def pair_keys(distributor_ids, product_ids):
+    # One int64 per pair, ordered by distributor then product
+    return (np.asarray(distributor_ids, dtype=np.int64) << 32) | np.asarray(product_ids, dtype=np.int64)
+
+
+def demand_matrix(distributor_ids, product_ids, day_offsets, units, days):
+    """Scatter daily demand rows into a matrix.
+
+    Returns the sorted pair keys and a float array of shape (pairs, days)
+    where ``[i, t]`` is the units ordered for pair ``i`` on day ``t``.
+    """
+    keys, index = np.unique(pair_keys(distributor_ids, product_ids), return_inverse=True)
+    flat = index * days + np.asarray(day_offsets, dtype=np.int64)
+    matrix = np.bincount(flat, weights=np.asarray(units, dtype=np.float64), minlength=len(keys) * days)
+    return keys, matrix.reshape(len(keys), days)
+
+
+def exponential_smoothing(demand, alpha):
+    """Final simple-exponential-smoothing level of each row, seeded with its first day.
+
+    Uses the closed form: day t counts with weight alpha * (1 - alpha) ** (days - 1 - t)
+    and the seed with (1 - alpha) ** (days - 1).
+    """
+    days = demand.shape[1]
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (days - 1)
+    return demand @ weights
+
+
+def reorder_suggestions(keys, demand, on_hand, window=14, alpha=0.3, lead_time_days=3,
+                        cover_days=7, service_z=1.65):
+    """Forecast daily demand per pair and pick the pairs that should reorder now.
+
+    The forecast is the larger of the ``window``-day moving average and the
+    smoothed level, so neither a quiet last week nor a quiet month hides
+    demand. A pair reorders when ``on_hand`` is at or below lead-time demand
+    plus safety stock; the suggested quantity tops it up to ``cover_days``
+    beyond the lead time. Returns a dict of equal-length arrays, most urgent
+    (fewest days of cover) first.
+    """
+    recent = demand[:, -window:]
+    moving_average = recent.mean(axis=1)
+    smoothed = exponential_smoothing(demand, alpha)
+    forecast = np.maximum(moving_average, smoothed)
+    safety = service_z * recent.std(axis=1) * np.sqrt(lead_time_days)
+    reorder_point = forecast * lead_time_days + safety
+    target = forecast * (lead_time_days + cover_days) + safety
+
+    reorder = (forecast > 0) & (on_hand <= reorder_point)
+    with np.errstate(divide='ignore'):
+        days_of_cover = np.where(forecast > 0, on_hand / forecast, np.inf)
+    order = np.flatnonzero(reorder)
+    order = order[np.argsort(days_of_cover[order], kind='stable')]
+    return {
+        'distributor_id': keys[order] >> 32,
+        'product_id': keys[order] & 0xFFFFFFFF,
+        'on_hand': on_hand[order],
+        'moving_average': moving_average[order],
+        'smoothed': smoothed[order],
+        'forecast': forecast[order],
+        'reorder_point': reorder_point[order],
+        'days_of_cover': days_of_cover[order],
+        'suggested_quantity': np.ceil(target[order] - on_hand[order]).astype(np.int64),
+    }
@@ -0,0 +1,177 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_statements):
+    """Declare the most SQL statements a view may issue per request.
+
+    Apply it below the route decorator. Overruns are logged, and raise
+    QueryBudgetExceeded when QUERY_BUDGET_STRICT is set (as in tests).
+    """
+    def decorator(view):
+        view.query_budget = max_statements
+        return view
+    return decorator
+
+
+@contextmanager
+def count_queries(engine):
+    """Count SQL statements executed on ``engine`` inside the block."""
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', _count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'after_cursor_execute', _count)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    """Per-endpoint request latency and SQL statistics in Prometheus text format.
+
+    Request and SQL hooks only do a few additions under a lock, so the
+    collector is cheap enough to leave enabled in production.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._statements = {}
+        self._requests = {}
+        self._sql_count = {}
+        self._sql_seconds = {}
+
+    def init_app(self, app, engine):
+        app.extensions['metrics'] = self
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _start_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql_count = 0
+        g.metrics_sql_seconds = 0.0
+
+    def _finish_request(self, response):
+        start = g.get('metrics_start')
+        if start is not None:
+            self.observe_request(
+                request.endpoint or 'unmatched',
+                request.method,
+                response.status_code,
+                time.perf_counter() - start,
+                g.metrics_sql_count,
+                g.metrics_sql_seconds
+            )
+            self._check_budget(g.metrics_sql_count)
+        return response
+
+    def _check_budget(self, sql_count):
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        if budget is None or sql_count <= budget:
+            return
+        message = f'{request.endpoint} issued {sql_count} SQL statements, budget is {budget}'
+        if current_app.config.get('QUERY_BUDGET_STRICT'):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.metrics_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, 'metrics_start', None)
+        if start is None or not has_request_context() or 'metrics_start' not in g:
+            return
+        g.metrics_sql_count += 1
+        g.metrics_sql_seconds += time.perf_counter() - start
+
+    def observe_request(self, endpoint, method, status, seconds, sql_count, sql_seconds):
+        key = (endpoint, method)
+        with self._lock:
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._statements[key] = Histogram(STATEMENT_BUCKETS)
+                self._sql_count[key] = 0
+                self._sql_seconds[key] = 0.0
+            self._latency[key].observe(seconds)
+            self._statements[key].observe(sql_count)
+            self._sql_count[key] += sql_count
+            self._sql_seconds[key] += sql_seconds
+            status_key = (endpoint, method, status)
+            self._requests[status_key] = self._requests.get(status_key, 0) + 1
+
+    def render(self, extra_counters=None):
+        lines = []
+        with self._lock:
+            lines += ['# HELP http_requests_total Requests handled, by endpoint and status.',
+                      '# TYPE http_requests_total counter']
+            for (endpoint, method, status), value in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {value}')
+
+            lines += _render_histogram('http_request_duration_seconds', 'Request latency in seconds.', self._latency)
+            lines += _render_histogram('db_statements_per_request', 'SQL statements issued per request.', self._statements)
+
+            lines += ['# HELP db_statements_total SQL statements issued while handling requests.',
+                      '# TYPE db_statements_total counter']
+            for (endpoint, method), value in sorted(self._sql_count.items()):
+                lines.append(f'db_statements_total{{endpoint="{endpoint}",method="{method}"}} {value}')
+
+            lines += ['# HELP db_statement_seconds_total Time spent executing SQL while handling requests.',
+                      '# TYPE db_statement_seconds_total counter']
+            for (endpoint, method), value in sorted(self._sql_seconds.items()):
+                lines.append(f'db_statement_seconds_total{{endpoint="{endpoint}",method="{method}"}} {value:.6f}')
+
+        for name, help_text, samples in extra_counters or []:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f'{name}{{{label_text}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _render_histogram(name, help_text, histograms):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for (endpoint, method), histogram in sorted(histograms.items()):
+        labels = f'endpoint="{endpoint}",method="{method}"'
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{{labels}}} {histogram.total:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return lines
@@ -1,4 +1,6 @@
-from app import app, db
+from app import create_app, db
+
+app = create_app()
 
 with app.app_context():
     result = db.session.execute(db.text("PRAGMA table_info(user);"))
@@ -0,0 +1,24 @@
+"""Add (user_type, pincode) index on user for distributor discovery
+
+Revision ID: 2a6f8d3e5b71
+Revises: 7e3b9c1d4a26
+Create Date: 2026-10-16 21:05:12.471903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a6f8d3e5b71'
+down_revision = '7e3b9c1d4a26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_user_type_pincode', 'user', ['user_type', 'pincode'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_type_pincode', table_name='user')
@@ -0,0 +1,66 @@
+"""Add composite lookup indexes on inventory, order and stock_request
+
+Revision ID: 4c2e9a7d1b53
+Revises: db473a96bff6
+Create Date: 2026-10-16 10:12:41.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c2e9a7d1b53'
+down_revision = 'db473a96bff6'
+branch_labels = None
+depends_on = None
+
+
+# (table, owner column, unique index, merge duplicates by summing quantity)
+INVENTORY_TABLES = [
+    ('distributor_inventory', 'distributor_id', 'ix_distributor_inventory_distributor_product', False),
+    ('shg_inventory', 'shg_id', 'ix_shg_inventory_shg_product', True),
+    ('pharmacist_inventory', 'pharmacist_id', 'ix_pharmacist_inventory_pharmacist_product', True),
+]
+
+
+def upgrade():
+    # Inventory rows are unique per (owner, product). Drop any duplicates left
+    # behind by concurrent inserts, keeping the newest row, before enforcing it.
+    # Distributor stock is set outright, so the newest row is the real count;
+    # SHG and pharmacist stock is added to on delivery, so each duplicate holds
+    # part of it and the kept row takes their sum.
+    for table, owner_column, index_name, merge in INVENTORY_TABLES:
+        if merge:
+            op.execute(
+                f'UPDATE {table} SET quantity = '
+                f'(SELECT SUM(dup.quantity) FROM {table} AS dup '
+                f'WHERE dup.{owner_column} = {table}.{owner_column} AND dup.product_id = {table}.product_id) '
+                f'WHERE id IN (SELECT MAX(id) FROM {table} GROUP BY {owner_column}, product_id HAVING COUNT(*) > 1)'
+            )
+        op.execute(
+            f'DELETE FROM {table} WHERE id NOT IN '
+            f'(SELECT MAX(id) FROM {table} GROUP BY {owner_column}, product_id)'
+        )
+        op.create_index(index_name, table, [owner_column, 'product_id'], unique=True)
+
+    op.create_index('ix_order_distributor_created', 'order', ['distributor_id', 'created_at'], unique=False)
+    op.create_index('ix_order_orderer_created', 'order', ['orderer_id', 'created_at'], unique=False)
+    op.create_index('ix_order_status_created', 'order', ['status', 'created_at'], unique=False)
+    op.create_index('ix_order_created', 'order', ['created_at'], unique=False)
+
+    op.create_index('ix_stock_request_distributor_created', 'stock_request', ['distributor_id', 'created_at'], unique=False)
+    op.create_index('ix_stock_request_requester_created', 'stock_request', ['requester_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_stock_request_requester_created', table_name='stock_request')
+    op.drop_index('ix_stock_request_distributor_created', table_name='stock_request')
+
+    op.drop_index('ix_order_created', table_name='order')
+    op.drop_index('ix_order_status_created', table_name='order')
+    op.drop_index('ix_order_orderer_created', table_name='order')
+    op.drop_index('ix_order_distributor_created', table_name='order')
+
+    for table, _, index_name, _ in reversed(INVENTORY_TABLES):
+        op.drop_index(index_name, table_name=table)
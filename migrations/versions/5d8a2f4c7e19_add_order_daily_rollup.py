@@ -0,0 +1,42 @@
+"""Add order_daily_rollup for reporting
+
+Revision ID: 5d8a2f4c7e19
+Revises: 9b1f3e6c2a84
+Create Date: 2026-10-16 18:20:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8a2f4c7e19'
+down_revision = '9b1f3e6c2a84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('order_daily_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('distributor_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('orders_placed', sa.Integer(), nullable=False),
+    sa.Column('units_placed', sa.Integer(), nullable=False),
+    sa.Column('orders_delivered', sa.Integer(), nullable=False),
+    sa.Column('units_delivered', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('delivery_seconds', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['distributor_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('day', 'distributor_id', 'product_id')
+    )
+    op.create_index('ix_order_daily_rollup_distributor_day', 'order_daily_rollup', ['distributor_id', 'day'], unique=False)
+    op.create_index('ix_order_daily_rollup_product_day', 'order_daily_rollup', ['product_id', 'day'], unique=False)
+    # Existing orders are folded in with `flask rebuild-rollups`
+
+
+def downgrade():
+    op.drop_index('ix_order_daily_rollup_product_day', table_name='order_daily_rollup')
+    op.drop_index('ix_order_daily_rollup_distributor_day', table_name='order_daily_rollup')
+    op.drop_table('order_daily_rollup')
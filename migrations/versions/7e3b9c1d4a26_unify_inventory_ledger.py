@@ -0,0 +1,112 @@
+"""Replace the per-role inventory tables with inventory + inventory_movement
+
+Revision ID: 7e3b9c1d4a26
+Revises: 5d8a2f4c7e19
+Create Date: 2026-10-16 19:42:08.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e3b9c1d4a26'
+down_revision = '5d8a2f4c7e19'
+branch_labels = None
+depends_on = None
+
+OLD_TABLES = [
+    ('distributor', 'distributor_inventory', 'distributor_id'),
+    ('shg', 'shg_inventory', 'shg_id'),
+    ('pharmacist', 'pharmacist_inventory', 'pharmacist_id'),
+]
+
+
+def upgrade():
+    op.create_table('inventory',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inventory_owner_product', 'inventory', ['owner_id', 'product_id'], unique=True)
+    op.create_index('ix_inventory_owner_updated', 'inventory', ['owner_id', 'updated_at'], unique=False)
+
+    op.create_table('inventory_movement',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=20), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('note', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['order.id'], ),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inventory_movement_owner', 'inventory_movement', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_inventory_movement_owner_product', 'inventory_movement', ['owner_id', 'product_id', 'id'], unique=False)
+    op.create_index('ix_inventory_movement_order', 'inventory_movement', ['order_id'], unique=False)
+
+    # Carry balances over, each with an opening movement so the ledger sums to the balance
+    for _, table, owner_column in OLD_TABLES:
+        op.execute(
+            f'INSERT INTO inventory (owner_id, product_id, quantity, updated_at) '
+            f'SELECT {owner_column}, product_id, quantity, updated_at FROM {table}'
+        )
+    op.execute(
+        "INSERT INTO inventory_movement (owner_id, product_id, delta, reason, note, created_at) "
+        "SELECT owner_id, product_id, quantity, 'set', 'opening balance', CURRENT_TIMESTAMP "
+        "FROM inventory WHERE quantity != 0"
+    )
+
+    for _, table, owner_column in OLD_TABLES:
+        op.drop_index(f'ix_{table}_{owner_column[:-3]}_updated', table_name=table)
+        op.drop_index(f'ix_{table}_{owner_column[:-3]}_product', table_name=table)
+        op.drop_table(table)
+
+    op.drop_index('ix_inventory_tombstone_owner_deleted', table_name='inventory_tombstone')
+    with op.batch_alter_table('inventory_tombstone') as batch_op:
+        batch_op.drop_column('owner_type')
+    op.create_index('ix_inventory_tombstone_owner_deleted', 'inventory_tombstone', ['owner_id', 'deleted_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_inventory_tombstone_owner_deleted', table_name='inventory_tombstone')
+    with op.batch_alter_table('inventory_tombstone') as batch_op:
+        batch_op.add_column(sa.Column('owner_type', sa.String(length=20), nullable=False, server_default='distributor'))
+    op.execute('UPDATE inventory_tombstone SET owner_type = (SELECT user_type FROM "user" WHERE "user".id = owner_id)')
+    op.create_index('ix_inventory_tombstone_owner_deleted', 'inventory_tombstone', ['owner_type', 'owner_id', 'deleted_at'], unique=False)
+
+    for user_type, table, owner_column in OLD_TABLES:
+        op.create_table(table,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column(owner_column, sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint([owner_column], ['user.id'], ),
+        sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(f'ix_{table}_{owner_column[:-3]}_product', table, [owner_column, 'product_id'], unique=True)
+        op.create_index(f'ix_{table}_{owner_column[:-3]}_updated', table, [owner_column, 'updated_at'], unique=False)
+        op.execute(
+            f'INSERT INTO {table} ({owner_column}, product_id, quantity, updated_at) '
+            f'SELECT owner_id, product_id, quantity, updated_at FROM inventory '
+            f'WHERE owner_id IN (SELECT id FROM "user" WHERE user_type = \'{user_type}\')'
+        )
+
+    op.drop_index('ix_inventory_movement_order', table_name='inventory_movement')
+    op.drop_index('ix_inventory_movement_owner_product', table_name='inventory_movement')
+    op.drop_index('ix_inventory_movement_owner', table_name='inventory_movement')
+    op.drop_table('inventory_movement')
+    op.drop_index('ix_inventory_owner_updated', table_name='inventory')
+    op.drop_index('ix_inventory_owner_product', table_name='inventory')
+    op.drop_table('inventory')
@@ -0,0 +1,43 @@
+"""Add (owner_id, updated_at) inventory indexes and inventory_tombstone for delta sync
+
+Revision ID: 9b1f3e6c2a84
+Revises: 4c2e9a7d1b53
+Create Date: 2026-10-16 14:03:27.550912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1f3e6c2a84'
+down_revision = '4c2e9a7d1b53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('inventory_tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_type', sa.String(length=20), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inventory_tombstone_owner_deleted', 'inventory_tombstone', ['owner_type', 'owner_id', 'deleted_at'], unique=False)
+
+    op.create_index('ix_distributor_inventory_distributor_updated', 'distributor_inventory', ['distributor_id', 'updated_at'], unique=False)
+    op.create_index('ix_shg_inventory_shg_updated', 'shg_inventory', ['shg_id', 'updated_at'], unique=False)
+    op.create_index('ix_pharmacist_inventory_pharmacist_updated', 'pharmacist_inventory', ['pharmacist_id', 'updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_pharmacist_inventory_pharmacist_updated', table_name='pharmacist_inventory')
+    op.drop_index('ix_shg_inventory_shg_updated', table_name='shg_inventory')
+    op.drop_index('ix_distributor_inventory_distributor_updated', table_name='distributor_inventory')
+
+    op.drop_index('ix_inventory_tombstone_owner_deleted', table_name='inventory_tombstone')
+    op.drop_table('inventory_tombstone')
@@ -0,0 +1,50 @@
+"""Add reorder_threshold and stock_alert tables
+
+Revision ID: b8d2f6a4c931
+Revises: 9c4e1a7f3d52
+Create Date: 2026-10-17 00:12:45.903284
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d2f6a4c931'
+down_revision = '9c4e1a7f3d52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reorder_threshold',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('threshold', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('owner_id', 'product_id')
+    )
+    op.create_table('stock_alert',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('threshold', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('resolved_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stock_alert_active_owner', 'stock_alert', ['owner_id', 'id'], unique=False,
+                    sqlite_where=sa.text('resolved_at IS NULL'), postgresql_where=sa.text('resolved_at IS NULL'))
+    op.create_index('ix_stock_alert_active_pair', 'stock_alert', ['owner_id', 'product_id'], unique=True,
+                    sqlite_where=sa.text('resolved_at IS NULL'), postgresql_where=sa.text('resolved_at IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_stock_alert_active_pair', table_name='stock_alert')
+    op.drop_index('ix_stock_alert_active_owner', table_name='stock_alert')
+    op.drop_table('stock_alert')
+    op.drop_table('reorder_threshold')
@@ -0,0 +1,97 @@
+"""Bulk seeding of synthetic data for benchmarks and query-budget checks."""
+from datetime import datetime, timedelta
+import random
+
+from app import db, rebuild_order_rollups, User, Product, Inventory, InventoryMovement, Order, StockRequest
+
+
+def seed(distributors=5, shgs=10, pharmacists=10, products=100, inventory_per_distributor=50,
+         orders=1000, stock_requests=500, rng_seed=42):
+    """Insert a synthetic dataset with bulk INSERTs and return the ids created.
+
+    Must be called inside an app context on an empty database.
+    """
+    rng = random.Random(rng_seed)
+    now = datetime.utcnow()
+
+    users = (
+        [('distributor', i) for i in range(distributors)]
+        + [('shg', i) for i in range(shgs)]
+        + [('pharmacist', i) for i in range(pharmacists)]
+    )
+    db.session.execute(db.insert(User), [{
+        'username': f'{user_type}-{i}',
+        'password_hash': '-',
+        'user_type': user_type,
+        'pincode': f'{110001 + i % 50}',
+        'mobile_number': f'9{i:09d}',
+        'created_at': now
+    } for user_type, i in users])
+    db.session.execute(db.insert(Product), [{
+        'name': f'Product {i}',
+        'description': f'Synthetic product number {i}',
+        'unit_price': round(rng.uniform(1, 500), 2),
+        'created_at': now
+    } for i in range(products)])
+
+    user_rows = db.session.execute(db.select(User.id, User.user_type)).all()
+    distributor_ids = [u.id for u in user_rows if u.user_type == 'distributor']
+    orderer_ids = [u.id for u in user_rows if u.user_type != 'distributor']
+    product_ids = list(db.session.execute(db.select(Product.id)).scalars())
+
+    stocked = {
+        distributor_id: rng.sample(product_ids, min(inventory_per_distributor, len(product_ids)))
+        for distributor_id in distributor_ids
+    }
+    balances = [{
+        'owner_id': distributor_id,
+        'product_id': product_id,
+        'quantity': rng.randint(0, 10000),
+        'updated_at': now
+    } for distributor_id, product_ids_held in stocked.items() for product_id in product_ids_held]
+    db.session.execute(db.insert(Inventory), balances)
+    db.session.execute(db.insert(InventoryMovement), [{
+        'owner_id': b['owner_id'],
+        'product_id': b['product_id'],
+        'delta': b['quantity'],
+        'reason': 'set',
+        'created_at': now
+    } for b in balances])
+
+    if orders:
+        statuses = ['placed', 'accepted', 'dispatched', 'delivered']
+        rows = []
+        for i in range(orders):
+            distributor_id = rng.choice(distributor_ids)
+            created_at = now - timedelta(minutes=orders - i)
+            status = rng.choice(statuses)
+            rows.append({
+                'distributor_id': distributor_id,
+                'orderer_id': rng.choice(orderer_ids),
+                'product_id': rng.choice(stocked[distributor_id] or product_ids),
+                'quantity': rng.randint(1, 20),
+                'status': status,
+                'created_at': created_at,
+                'delivered_at': created_at + timedelta(hours=rng.randint(1, 72)) if status == 'delivered' else None
+            })
+        db.session.execute(db.insert(Order), rows)
+        rebuild_order_rollups()
+
+    if stock_requests:
+        db.session.execute(db.insert(StockRequest), [{
+            'distributor_id': rng.choice(distributor_ids),
+            'requester_id': rng.choice(orderer_ids),
+            'name': f'Request {i}',
+            'pincode': '110001',
+            'mobile': '9000000000',
+            'status': 'pending',
+            'created_at': now - timedelta(minutes=stock_requests - i)
+        } for i in range(stock_requests)])
+
+    db.session.commit()
+    return {
+        'distributor_ids': distributor_ids,
+        'shg_ids': [u.id for u in user_rows if u.user_type == 'shg'],
+        'pharmacist_ids': [u.id for u in user_rows if u.user_type == 'pharmacist'],
+        'product_ids': product_ids,
+    }
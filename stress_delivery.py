@@ -0,0 +1,92 @@
+"""Concurrent delivery stress test.
+
+Seeds a distributor holding STOCK units and more single-unit orders than
+that, then delivers all of them from many threads at once. With the atomic
+decrement exactly STOCK deliveries must succeed, distributor stock must end
+at zero and the orderer must receive exactly STOCK units.
+
+    python stress_delivery.py [--threads 32] [--stock 200] [--orders 600]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from app import create_app, db, User, Product, Order, Inventory, InventoryMovement, set_stock
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--stock', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=600)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'stress.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+
+    with app.app_context():
+        db.create_all()
+        distributor = User(username='stress-distributor', user_type='distributor', pincode='000000',
+                           mobile_number='0', password_hash='-')
+        pharmacist = User(username='stress-pharmacist', user_type='pharmacist', pincode='000000',
+                          mobile_number='0', password_hash='-')
+        product = Product(name='stress-product', unit_price=1.0)
+        db.session.add_all([distributor, pharmacist, product])
+        db.session.flush()
+        set_stock({(distributor.id, product.id): args.stock})
+        orders = [Order(distributor_id=distributor.id, orderer_id=pharmacist.id, product_id=product.id,
+                        quantity=1, status='placed') for _ in range(args.orders)]
+        db.session.add_all(orders)
+        db.session.commit()
+        order_ids = [o.id for o in orders]
+        distributor_id, pharmacist_id, product_id = distributor.id, pharmacist.id, product.id
+
+    statuses = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.threads)
+
+    def worker(ids):
+        client = app.test_client()
+        barrier.wait()
+        for order_id in ids:
+            status = client.put(f'/api/orders/{order_id}/deliver', json={'distributor_id': distributor_id}).status_code
+            with lock:
+                statuses[status] += 1
+
+    threads = [threading.Thread(target=worker, args=(order_ids[i::args.threads],))
+               for i in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        remaining = Inventory.query.filter_by(owner_id=distributor_id, product_id=product_id).one().quantity
+        received = Inventory.query.filter_by(owner_id=pharmacist_id, product_id=product_id).one().quantity
+        delivered = Order.query.filter_by(status='delivered').count()
+        # The movement ledger must sum to each materialized balance
+        ledger = dict(db.session.execute(
+            db.select(InventoryMovement.owner_id, db.func.sum(InventoryMovement.delta))
+            .group_by(InventoryMovement.owner_id)
+        ).all())
+
+    print(f'{args.orders} deliveries on {args.threads} threads in {elapsed:.2f}s')
+    print(f'responses: {dict(statuses)}')
+    print(f'delivered={delivered} distributor_remaining={remaining} pharmacist_received={received}')
+    print(f'ledger: distributor={ledger.get(distributor_id)} pharmacist={ledger.get(pharmacist_id)}')
+
+    ok = (statuses[200] == args.stock and delivered == args.stock
+          and remaining == 0 and received == args.stock
+          and ledger.get(distributor_id) == remaining and ledger.get(pharmacist_id) == received)
+    print('OK: no lost updates' if ok else 'FAIL: inventory out of balance')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,15 @@
+import pytest
+
+from check_query_budgets import SCALES, cold_get, seeded_app
+
+
+@pytest.fixture(scope='session')
+def datasets():
+    """Strict-budget apps seeded with each dataset in SCALES, as ``{scale: (app, ids)}``."""
+    return {scale: seeded_app(scale, QUERY_BUDGET_STRICT=True) for scale in SCALES}
+
+
+@pytest.fixture
+def count_queries():
+    """``count_queries(app, path)`` GETs ``path`` with cold caches and returns ``(response, statements)``."""
+    return cold_get
@@ -0,0 +1,30 @@
+import pytest
+
+from check_query_budgets import LIST_ENDPOINTS, declared_budget, list_endpoints
+from metrics import QueryBudgetExceeded
+
+ENDPOINT_NAMES = [name for name, _ in LIST_ENDPOINTS]
+
+
+@pytest.mark.parametrize('name', ENDPOINT_NAMES)
+def test_list_endpoint_declares_a_budget(datasets, name):
+    app, _ = datasets['small']
+    assert declared_budget(app, name) is not None
+
+
+@pytest.mark.parametrize('name', ENDPOINT_NAMES)
+def test_query_count_does_not_grow_with_data(datasets, count_queries, name):
+    # QUERY_BUDGET_STRICT makes a request over its declared budget raise here
+    counts = {}
+    for scale, (app, ids) in datasets.items():
+        response, statements = count_queries(app, dict(list_endpoints(ids))[name])
+        assert response.status_code == 200, response.get_data(as_text=True)
+        counts[scale] = len(statements)
+    assert counts['small'] == counts['large']
+
+
+def test_strict_mode_raises_on_overrun(datasets, count_queries, monkeypatch):
+    app, ids = datasets['small']
+    monkeypatch.setattr(app.view_functions['api.get_orders'], 'query_budget', 0)
+    with pytest.raises(QueryBudgetExceeded):
+        count_queries(app, '/api/orders')
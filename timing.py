@@ -0,0 +1,18 @@
+"""Timing helpers shared by the benchmark scripts and traffic replay."""
+import time
+
+
+def timed(fn, iterations):
+    """Call ``fn`` once to warm up, then ``iterations`` times; return the best time and its result."""
+    fn()
+    best = float('inf')
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
@@ -0,0 +1,276 @@
+"""Record production request traffic and replay it against a running instance.
+
+Recording is a WSGI middleware enabled with the TRAFFIC_RECORD_PATH setting;
+each request becomes one NDJSON line with its method, path, body and start
+time. Password fields in JSON and form bodies are replaced with a placeholder
+before they are written, so replayed logins and sign-ups still exercise the
+routes (and the hashing cost) without the log holding credentials. Replay
+sends those requests concurrently and reports throughput, error rate and
+latency percentiles:
+
+    TRAFFIC_RECORD_PATH=traffic.ndjson flask --app app run
+    python traffic.py replay traffic.ndjson --target http://127.0.0.1:5000 --threads 16
+    python traffic.py replay traffic.ndjson --processes 4 --threads 8 --rate 500
+"""
+import argparse
+import base64
+from collections import defaultdict
+import http.client
+import json
+from multiprocessing import Pool
+import re
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from timing import percentile
+
+
+REDACTED_FIELDS = {'password', 'new_password', 'old_password', 'current_password'}
+REDACTED = '[redacted]'
+
+
+class _TeeInput:
+    def __init__(self, stream, limit):
+        self._stream = stream
+        self._limit = limit
+        self.captured = bytearray()
+        self.truncated = False
+
+    def _keep(self, data):
+        room = self._limit - len(self.captured)
+        if len(data) > room:
+            self.truncated = True
+        self.captured += data[:max(room, 0)]
+        return data
+
+    def read(self, *args):
+        return self._keep(self._stream.read(*args))
+
+    def readline(self, *args):
+        return self._keep(self._stream.readline(*args))
+
+    def readlines(self, *args):
+        return [self._keep(line) for line in self._stream.readlines(*args)]
+
+    def __iter__(self):
+        for line in self._stream:
+            yield self._keep(line)
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if k in REDACTED_FIELDS else _redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+def redact_body(body, content_type):
+    """Return ``body`` with password fields replaced, or None if it cannot be made safe."""
+    if not any(field.encode() in body for field in REDACTED_FIELDS):
+        return body
+    media_type = (content_type or '').split(';', 1)[0].strip().lower()
+    try:
+        if media_type == 'application/json':
+            return json.dumps(_redact(json.loads(body))).encode()
+        if media_type == 'application/x-www-form-urlencoded':
+            pairs = parse_qsl(body.decode(), keep_blank_values=True)
+            return urlencode([(k, REDACTED if k in REDACTED_FIELDS else v) for k, v in pairs]).encode()
+    except ValueError:
+        pass
+    return None
+
+
+class TrafficRecorder:
+    """WSGI middleware appending one NDJSON line per request to ``path``.
+
+    Bodies larger than ``max_body`` bytes are not stored; those requests are
+    recorded with ``"body_truncated": true`` and skipped on replay. So are
+    bodies that mention a password field but cannot be parsed to redact it.
+    """
+
+    def __init__(self, wsgi_app, path, max_body=1024 * 1024):
+        self.wsgi_app = wsgi_app
+        self.max_body = max_body
+        self._file = open(path, 'a', buffering=1)
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        started_at = time.time()
+        start = time.perf_counter()
+        tee = _TeeInput(environ['wsgi.input'], self.max_body)
+        environ['wsgi.input'] = tee
+        status_holder = []
+
+        def recording_start_response(status, headers, exc_info=None):
+            status_holder.append(int(status.split(' ', 1)[0]))
+            return start_response(status, headers, exc_info)
+
+        try:
+            return self.wsgi_app(environ, recording_start_response)
+        finally:
+            query = environ.get('QUERY_STRING')
+            body = bytes(tee.captured)
+            truncated = tee.truncated
+            if body and not truncated:
+                body = redact_body(body, environ.get('CONTENT_TYPE'))
+                truncated = body is None
+            elif truncated:
+                body = None
+            record = {
+                'ts': started_at,
+                'method': environ['REQUEST_METHOD'],
+                'path': environ.get('PATH_INFO', '') + (f'?{query}' if query else ''),
+                'content_type': environ.get('CONTENT_TYPE') or None,
+                'body': base64.b64encode(body).decode() if body else None,
+                'body_truncated': truncated,
+                'status': status_holder[0] if status_holder else None,
+                'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+            }
+            with self._lock:
+                self._file.write(json.dumps(record) + '\n')
+
+
+def route_key(method, path):
+    # Group /api/orders/123/status and /api/orders/456/status together
+    return f"{method} {re.sub(r'/[0-9]+(?=/|$)', '/{id}', path.split('?')[0])}"
+
+
+def load_records(path, limit=None):
+    records = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('body_truncated'):
+                continue
+            records.append(record)
+            if limit and len(records) >= limit:
+                break
+    return records
+
+
+def schedule(records, rate, speed):
+    """Return send offsets in seconds from the start of the replay."""
+    if rate:
+        return [i / rate for i in range(len(records))]
+    if not speed:
+        return [0.0] * len(records)
+    first = records[0]['ts']
+    return [(r['ts'] - first) / speed for r in records]
+
+
+def _run_worker(job):
+    target, items, threads, start_at = job
+    split = urlsplit(target)
+    results = []
+    lock = threading.Lock()
+
+    def send_all(assigned):
+        conn = http.client.HTTPConnection(split.hostname, split.port or 80, timeout=30)
+        local = []
+        for offset, record in assigned:
+            delay = start_at + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            body = base64.b64decode(record['body']) if record.get('body') else None
+            headers = {'Content-Type': record['content_type']} if record.get('content_type') else {}
+            start = time.perf_counter()
+            try:
+                conn.request(record['method'], record['path'], body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(split.hostname, split.port or 80, timeout=30)
+                status = None
+            local.append((route_key(record['method'], record['path']), time.perf_counter() - start, status))
+        conn.close()
+        with lock:
+            results.extend(local)
+
+    workers = [threading.Thread(target=send_all, args=(items[i::threads],)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return results
+
+
+def summarize(results, elapsed):
+    def stats(rows):
+        latencies = [latency for _, latency, _ in rows]
+        return {
+            'requests': len(rows),
+            'errors': sum(1 for _, _, status in rows if status is None or status >= 500),
+            'client_errors': sum(1 for _, _, status in rows if status is not None and 400 <= status < 500),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p90_ms': round(percentile(latencies, 90) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        }
+
+    by_route = defaultdict(list)
+    for row in results:
+        by_route[row[0]].append(row)
+    summary = stats(results)
+    summary['throughput_rps'] = round(len(results) / elapsed, 1)
+    summary['error_rate'] = round(summary['errors'] / len(results), 4)
+    summary['routes'] = {key: stats(rows) for key, rows in sorted(by_route.items())}
+    return summary
+
+
+def replay(args):
+    records = load_records(args.file, args.limit)
+    if not records:
+        print('no replayable requests in', args.file, file=sys.stderr)
+        return 1
+    offsets = schedule(records, args.rate, args.speed)
+    items = list(zip(offsets, records))
+
+    start_at = time.time() + 0.5
+    jobs = [(args.target, items[i::args.processes], args.threads, start_at) for i in range(args.processes)]
+    start = time.perf_counter()
+    if args.processes == 1:
+        results = _run_worker(jobs[0])
+    else:
+        with Pool(args.processes) as pool:
+            results = [row for chunk in pool.map(_run_worker, jobs) for row in chunk]
+    elapsed = time.perf_counter() - start - 0.5
+
+    summary = summarize(results, elapsed)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+
+    print(f"{summary['requests']} requests in {elapsed:.2f}s: {summary['throughput_rps']} req/s, "
+          f"error rate {summary['error_rate']:.2%} ({summary['client_errors']} 4xx)")
+    print(f"latency p50={summary['p50_ms']}ms p90={summary['p90_ms']}ms p99={summary['p99_ms']}ms\n")
+    print(f"{'route':<45} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'5xx':>5}")
+    for key, r in summary['routes'].items():
+        print(f"{key:<45} {r['requests']:>7} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['errors']:>5}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    replay_parser = commands.add_parser('replay', help='replay a recorded NDJSON file')
+    replay_parser.add_argument('file')
+    replay_parser.add_argument('--target', default='http://127.0.0.1:5000')
+    replay_parser.add_argument('--threads', type=int, default=8, help='threads per process')
+    replay_parser.add_argument('--processes', type=int, default=1)
+    replay_parser.add_argument('--rate', type=float, help='fixed total request rate per second')
+    replay_parser.add_argument('--speed', type=float, default=1.0,
+                               help='multiple of the recorded pace when --rate is not set; 0 = as fast as possible')
+    replay_parser.add_argument('--limit', type=int, help='replay only the first N requests')
+    replay_parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args()
+    return replay(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())